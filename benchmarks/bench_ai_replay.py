@@ -0,0 +1,74 @@
+"""Replay a recorded AI cassette through openai_service and report latency per op.
+
+Record first on a test account (AI_CASSETTE_MODE=record, exercise the bot), then:
+
+    python benchmarks/bench_ai_replay.py [cassette] [--scale 1.0] [--concurrency 8]
+
+--scale 0 replays instantly and measures only local overhead (routing, hedging,
+parsing, accounting). Every response is parsed the way the service parses it, so a
+non-zero failure count after a prompt or parser change is a regression.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings  # noqa: E402
+from services import cassette, openai_service  # noqa: E402
+
+
+def _pct(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run(entries: list[dict], scale: float, concurrency: int) -> None:
+    openai_service.set_providers(cassette.ReplayProvider(entries, scale))
+    sem = asyncio.Semaphore(concurrency)
+    results: dict[str, list[tuple[float, float]]] = {}
+    failures: dict[str, int] = {}
+
+    async def one(entry: dict) -> None:
+        parse = json.loads if entry["json_mode"] else openai_service._text
+        async with sem:
+            start = time.monotonic()
+            try:
+                await openai_service._generate(
+                    entry["op"], entry["system"], entry["messages"], parse, json_mode=entry["json_mode"],
+                )
+            except Exception as e:
+                failures[entry["op"]] = failures.get(entry["op"], 0) + 1
+                print(f"  {entry['op']}: {type(e).__name__}: {e}")
+                return
+            results.setdefault(entry["op"], []).append((time.monotonic() - start, entry["latency"]))
+
+    start = time.monotonic()
+    await asyncio.gather(*(one(e) for e in entries))
+    wall = time.monotonic() - start
+
+    print(f"{len(entries)} calls, scale {scale}, concurrency {concurrency}, wall {wall:.2f}s")
+    print(f"{'op':<20}{'n':>5}{'p50':>9}{'p95':>9}{'rec p50':>9}{'rec p95':>9}{'fail':>6}")
+    for op in sorted(set(results) | set(failures)):
+        rows = results.get(op, [])
+        got = [r[0] for r in rows] or [0.0]
+        rec = [r[1] * scale for r in rows] or [0.0]
+        print(f"{op:<20}{len(rows):>5}{statistics.median(got):>9.3f}{_pct(got, 0.95):>9.3f}"
+              f"{statistics.median(rec):>9.3f}{_pct(rec, 0.95):>9.3f}{failures.get(op, 0):>6}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("cassette", nargs="?", default=settings.AI_CASSETTE_PATH)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(run(cassette.load(args.cassette), args.scale, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
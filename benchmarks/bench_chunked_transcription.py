@@ -0,0 +1,118 @@
+"""Whole vs chunked transcription of long voice notes, on synthetic Ogg/Opus audio.
+
+Builds Ogg/Opus streams of the given lengths (fake 20 ms packets carrying their own index),
+splits them with services/ogg.py and "transcribes" each chunk with a stub whose latency is
+OVERHEAD + PER_AUDIO_SECOND × chunk duration, roughly what Gemini inline audio shows. The
+stub emits one word per 0.4 s of audio, so stitching is checked against the exact text.
+
+    python benchmarks/bench_chunked_transcription.py [--scale 0.02] [seconds ...]
+
+--scale shrinks the stub's sleeps. Reported latencies are local CPU time (splitting,
+stitching) plus the time spent waiting on stub calls, scaled back to real seconds. Only
+TRANSCRIBE_CHUNK_CONCURRENCY chunks run at once, so long notes wait in waves.
+"""
+import argparse
+import asyncio
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings  # noqa: E402
+from services import ogg  # noqa: E402
+from services.voice_transcription import transcribe_voice  # noqa: E402
+
+PACKET_SAMPLES = 960  # 20 ms at 48 kHz
+PACKETS_PER_PAGE = 50
+PACKET_BYTES = 80  # ~32 kbit/s
+PRE_SKIP = 312
+WORD_EVERY = 20  # packets per word
+
+OVERHEAD = 1.5
+PER_AUDIO_SECOND = 0.12
+
+
+def synthetic_voice(seconds: float, serial: int = 0x5EED) -> bytes:
+    head = b"OpusHead" + struct.pack("<BBHIhB", 1, 1, PRE_SKIP, 48000, 0, 0)
+    vendor = b"bench"
+    tags = b"OpusTags" + struct.pack("<I", len(vendor)) + vendor + struct.pack("<I", 0)
+    pages = [
+        ogg.Page(ogg.BOS, 0, serial, 0, bytes([len(head)]), memoryview(head)),
+        ogg.Page(0, 0, serial, 1, bytes([len(tags)]), memoryview(tags)),
+    ]
+    n_packets = int(seconds * 50)
+    filler = bytes(PACKET_BYTES - 4)
+    for page_no, first in enumerate(range(0, n_packets, PACKETS_PER_PAGE)):
+        idx = range(first, min(first + PACKETS_PER_PAGE, n_packets))
+        data = b"".join(struct.pack("<I", i) + filler for i in idx)
+        granule = PRE_SKIP + (idx[-1] + 1) * PACKET_SAMPLES
+        flags = ogg.EOS if idx[-1] == n_packets - 1 else 0
+        pages.append(ogg.Page(flags, granule, serial, page_no + 2, bytes([PACKET_BYTES] * len(idx)),
+                              memoryview(data)))
+    return b"".join(ogg.write_page(p) for p in pages)
+
+
+def _words(chunk: bytes) -> list[str]:
+    pages = ogg.parse_pages(chunk)
+    words = []
+    for page in pages[2:]:
+        for off in range(0, len(page.data), PACKET_BYTES):
+            i = struct.unpack_from("<I", page.data, off)[0]
+            if i % WORD_EVERY == 0:
+                words.append(f"слово{i // WORD_EVERY}")
+    return words
+
+
+def stub_transcriber(scale: float, sleeps: list[float]):
+    async def transcribe(chunk: bytes) -> str:
+        latency = OVERHEAD + PER_AUDIO_SECOND * ogg.duration(chunk)
+        sleeps.append(latency)
+        await asyncio.sleep(latency * scale)
+        return " ".join(_words(chunk))
+
+    return transcribe
+
+
+async def _timed(coro, scale: float, sleeps: list[float]):
+    """(result, local CPU seconds + simulated waiting in real seconds)."""
+    sleeps.clear()
+    start, cpu_start = time.perf_counter(), time.process_time()
+    result = await coro
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    return result, cpu + max(0.0, elapsed - cpu) / scale
+
+
+async def bench(seconds: float, scale: float) -> None:
+    audio = synthetic_voice(seconds)
+    expected = " ".join(_words(audio))
+    sleeps: list[float] = []
+    transcribe = stub_transcriber(scale, sleeps)
+
+    start = time.perf_counter()
+    chunks = ogg.split_opus(audio, settings.TRANSCRIBE_CHUNK_SECONDS, settings.TRANSCRIBE_CHUNK_OVERLAP)
+    split_ms = (time.perf_counter() - start) * 1000
+
+    _, whole = await _timed(transcribe(audio), scale, sleeps)
+    text, chunked = await _timed(transcribe_voice(audio, transcribe), scale, sleeps)
+
+    print(f"{seconds:>7.0f}{len(audio) / 1024:>9.0f}{len(chunks):>8}{split_ms:>10.1f}"
+          f"{whole:>9.1f}{chunked:>10.1f}{'ok' if text == expected else 'MISMATCH':>10}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("seconds", nargs="*", type=float, default=[30, 60, 120, 300, 600])
+    parser.add_argument("--scale", type=float, default=0.02)
+    args = parser.parse_args()
+    print(f"chunk {settings.TRANSCRIBE_CHUNK_SECONDS}s, overlap {settings.TRANSCRIBE_CHUNK_OVERLAP}s; "
+          f"stub latency {OVERHEAD}s + {PER_AUDIO_SECOND}s per audio second")
+    print(f"{'audio s':>7}{'KiB':>9}{'chunks':>8}{'split ms':>10}{'whole s':>9}{'chunked s':>10}{'stitch':>10}")
+    for seconds in args.seconds:
+        await bench(seconds, args.scale)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""Crisis detection: automaton (services/crisis.py) vs the previous per-keyword substring scan.
+
+Generates a synthetic corpus of chat-like messages; a share of them carries a crisis phrase,
+half verbatim and half inflected / with ё, caps or punctuation, and as many clean ones carry
+an everyday sentence that shares words with a crisis phrase ("закончу все упражнения").
+Reports throughput, how many of the planted phrases each detector finds and its false hits,
+then checks every everyday sentence on its own. A second table grows the pattern list with
+synthetic stems to show how each scales.
+
+    python benchmarks/bench_crisis.py [messages] [crisis_share]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.crisis import CRISIS_KEYWORDS, _Automaton, detect_crisis, normalize  # noqa: E402
+
+FILLER = (
+    "сегодня опять плохо спал снились взрывы утром болела голова потом пошёл на работу "
+    "с женой поругались из-за ерунды дети шумят раздражает всё вечером немного полегчало "
+    "сделал дыхательное упражнение как в уроке стало спокойнее думаю о ребятах из взвода "
+    "жизнь вроде налаживается но иногда накатывает хочу выспаться и ни о чём не думать"
+).split()
+
+VERBATIM = CRISIS_KEYWORDS
+INFLECTED = [
+    "Не хочется жить", "покончу с собой", "убью себя", "мысли о суициде", "самоубийство",
+    "хотела умереть", "ЛУЧШЕ БЫ Я УМЕРЛА", "смысла, нет", "закончить всё!", "уйду из жизни",
+    "Жить не хочу", "нет смысла жить",
+]
+# real phrasing that must not be flagged
+EVERYDAY = [
+    "я закончу все упражнения завтра", "хочу закончить все уроки сегодня", "покончим с уроком",
+    "хочу умерить аппетит", "в общаге жить не хочу, перееду", "жить не хочется в этом городе",
+    "закончить всё задание не успел", "хотела умерить пыл на работе", "закончу все дела и лягу",
+    "хочется закончить все пораньше", "с ним жить не хочу больше в одной комнате",
+]
+
+
+def legacy_detect(text: str) -> list[str]:
+    text_lower = text.lower()
+    return [kw for kw in CRISIS_KEYWORDS if kw in text_lower]
+
+
+def corpus(n: int, share: float, seed: int = 7) -> list[tuple[str, bool]]:
+    rnd = random.Random(seed)
+    messages = []
+    for _ in range(n):
+        words = rnd.choices(FILLER, k=rnd.randint(8, 60))
+        planted = rnd.random() < share
+        at = rnd.randrange(len(words) + 1)
+        if planted:
+            # a sentence of its own, as people write it
+            phrase = rnd.choice(VERBATIM if rnd.random() < 0.5 else INFLECTED)
+            if at:
+                words[at - 1] += "."
+            words.insert(at, phrase + ".")
+        elif rnd.random() < share:
+            words.insert(at, rnd.choice(EVERYDAY))
+        messages.append((" ".join(words), planted))
+    return messages
+
+
+def run(name: str, detect, messages: list[tuple[str, bool]]) -> None:
+    start = time.perf_counter()
+    flags = [bool(detect(text)) for text, _ in messages]
+    elapsed = time.perf_counter() - start
+    planted = sum(p for _, p in messages)
+    found = sum(f and p for f, (_, p) in zip(flags, messages))
+    false = sum(f and not p for f, (_, p) in zip(flags, messages))
+    print(f"{name:<10}{len(messages) / elapsed:>12,.0f}{elapsed / len(messages) * 1e6:>10.2f}"
+          f"{found:>8}/{planted:<8}{false:>7}")
+
+
+def everyday(detectors) -> None:
+    print(f"\neveryday sentences flagged (of {len(EVERYDAY)}):")
+    for name, detect in detectors:
+        hits = [text for text in EVERYDAY if detect(text)]
+        print(f"{name:<10}{len(hits):>4}  {'; '.join(hits)}")
+
+
+def scaling(messages: list[tuple[str, bool]], sizes=(10, 100, 1000, 5000)) -> None:
+    rnd = random.Random(11)
+    alphabet = "абвгдежзийклмнопрстуфхцчшщыэюя"
+    texts = [t for t, _ in messages[:20_000]]
+    print(f"\n{'patterns':>8}{'legacy µs':>12}{'automaton µs':>14}")
+    for size in sizes:
+        keywords = list(CRISIS_KEYWORDS) + [
+            "".join(rnd.choices(alphabet, k=rnd.randint(6, 12))) for _ in range(size - len(CRISIS_KEYWORDS))
+        ]
+        automaton = _Automaton({normalize(k): k for k in keywords})
+
+        start = time.perf_counter()
+        for text in texts:
+            low = text.lower()
+            [kw for kw in keywords if kw in low]
+        legacy = (time.perf_counter() - start) / len(texts) * 1e6
+
+        start = time.perf_counter()
+        for text in texts:
+            automaton.search(normalize(text))
+        compiled = (time.perf_counter() - start) / len(texts) * 1e6
+        print(f"{size:>8}{legacy:>12.2f}{compiled:>14.2f}")
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    share = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+    messages = corpus(n, share)
+    chars = sum(len(t) for t, _ in messages)
+    print(f"{n} messages, {chars / n:.0f} chars avg, {share:.0%} with a crisis phrase")
+    print(f"{'detector':<10}{'msg/s':>12}{'µs/msg':>10}{'found':>8}{'':<9}{'false':>7}")
+    run("legacy", legacy_detect, messages)
+    run("automaton", detect_crisis, messages)
+    everyday([("legacy", legacy_detect), ("automaton", detect_crisis)])
+    scaling(messages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Throughput of sharded mode vs worker count, with a synthetic CPU-bound handler.
+
+Each update costs ~HANDLER_MS of CPU (stand-in for aiogram parsing + handler work) and
+updates of the same user must stay in order. Run on a multi-core box:
+
+    python benchmarks/bench_workers.py [updates] [users]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workers import ShardedIngress, run_worker_loop  # noqa: E402
+
+HANDLER_MS = 2.0
+
+
+def _burn(ms: float) -> None:
+    end = time.process_time() + ms / 1000
+    x = 0
+    while time.process_time() < end:
+        x += 1
+
+
+def bench_worker(index: int, queue, metrics_queue=None) -> None:
+    last_seq: dict[int, int] = {}
+
+    async def handle(update: dict):
+        user_id = update["message"]["from"]["id"]
+        seq = update["update_id"]
+        if last_seq.get(user_id, -1) > seq:
+            raise SystemExit(f"worker-{index}: order violated for user {user_id}")
+        last_seq[user_id] = seq
+        _burn(HANDLER_MS)
+
+    asyncio.run(run_worker_loop(queue, handle))
+
+
+def run(workers: int, updates: int, users: int) -> float:
+    ingress = ShardedIngress(workers, target=bench_worker)
+    ingress.start()
+    time.sleep(0.5)  # let spawned interpreters boot
+    start = time.perf_counter()
+    for seq in range(updates):
+        ingress.submit({"update_id": seq, "message": {"from": {"id": 1000 + seq % users}, "text": "x"}})
+    ingress.stop(timeout=None)
+    return updates / (time.perf_counter() - start)
+
+
+def main():
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    cores = os.cpu_count() or 1
+    print(f"{updates} updates, {users} users, {HANDLER_MS} ms CPU/update, {cores} cores")
+    base = None
+    for workers in (1, 2, 4, 8):
+        if workers > cores:
+            break
+        rate = run(workers, updates, users)
+        base = base or rate
+        print(f"  workers={workers}: {rate:8.0f} updates/s  (x{rate / base:.2f})")
+
+
+if __name__ == "__main__":
+    main()
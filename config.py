@@ -6,8 +6,80 @@ class Settings(BaseSettings):
     SUPABASE_URL: str
     SUPABASE_KEY: str
     GEMINI_API_KEY: str
-    OPENROUTER_API_KEY: str = ""
+    OPENROUTER_API_KEY: str = ""  # enables hedged requests to OpenRouter as secondary provider
+    OPENROUTER_MODEL: str = "openai/gpt-4o-mini"
     MANAGER_GROUP_CHAT_ID: int = 0
+    PENDING_STORE_BACKEND: str = "memory"  # memory | supabase
+    PENDING_ACTION_TTL_SECONDS: int = 900
+    WORKERS: int = 0  # >0 — ingress + N sharded worker processes (see workers.py)
+    WEBHOOK_URL: str = ""  # sharded mode only; empty — long polling
+    WEBHOOK_SECRET: str = ""  # required with WEBHOOK_URL; checked on every webhook request
+    AI_MAX_IN_FLIGHT: int = 8
+    AI_MAX_QUEUE: int = 32
+    AI_QUEUE_TIMEOUT: float = 20.0  # seconds an interactive request may wait for a slot
+    AI_QUEUE_TIMEOUT_BACKGROUND: float = 120.0  # questionnaire analysis runs in background
+    # concurrency cap per priority class (services/admission.py), within AI_MAX_IN_FLIGHT
+    AI_PRIORITY_LIMITS: dict[str, int] = {"interactive": 8, "normal": 5, "background": 3}
+    AI_PRIORITY_AGING: float = 30.0  # seconds of waiting that raise a request by one class
+    # route → (tokens per second, burst); routes not listed are not limited
+    RATE_LIMITS: dict[str, tuple[float, float]] = {
+        "psychologist": (0.2, 5),
+        "transcription": (0.1, 3),
+        "weekly_check": (0.05, 2),
+    }
+    RATE_LIMIT_MAX_BUCKETS: int = 10_000
+    STREAM_PSYCHOLOGIST: bool = True  # progressive message edits while the answer is generated
+    STREAM_EDIT_INTERVAL: float = 1.5  # seconds between edits (Telegram throttles frequent edits)
+    AI_CALL_TIMEOUT: float = 90.0  # per Gemini text call (per chunk when streaming)
+    AI_TRANSCRIBE_TIMEOUT: float = 180.0
+    TRANSCRIPT_CACHE_MAX: int = 1000  # in-memory entries in front of ptsd_transcripts
+    TRANSCRIPT_CACHE_TTL: float = 7 * 24 * 3600.0  # seconds
+    TRANSCRIBE_WORKERS: int = 4  # concurrent voice download + transcription jobs
+    TRANSCRIBE_MAX_QUEUE: int = 50
+    TRANSCRIBE_TIMEOUT_BASE: float = 30.0  # job timeout = base + per_second × voice duration,
+    TRANSCRIBE_TIMEOUT_PER_SECOND: float = 1.0  # capped by AI_TRANSCRIBE_TIMEOUT
+    TRANSCRIBE_CHUNK_SECONDS: float = 45.0  # longer voice notes are split and transcribed in parallel
+    TRANSCRIBE_CHUNK_OVERLAP: float = 3.0
+    TRANSCRIBE_CHUNK_CONCURRENCY: int = 3  # chunks of one voice note transcribed at a time
+    VOICE_MAX_BYTES: int = 20 * 1024 * 1024  # rejected before download (Bot API getFile limit)
+    VOICE_SPOOL_BYTES: int = 1024 * 1024  # larger notes download to a temp file + mmap
+    CHAT_HISTORY_LIMIT: int = 20  # max raw turns fetched after the rolling summary
+    CHAT_CONTEXT_TOKEN_BUDGET: int = 3000  # summary + recent turns, local estimate
+    CHAT_SUMMARY_TRIGGER_TURNS: int = 12  # unsummarised turns that trigger a background fold
+    CHAT_SUMMARY_KEEP_TURNS: int = 6  # newest turns always left out of the fold
+    CHAT_SUMMARY_FOLD_MAX: int = 60
+    CHAT_SESSION_MAX: int = 2000  # live psychologist contexts kept in memory (LRU)
+    CHAT_SESSION_IDLE: float = 1800.0  # seconds idle before a session is rebuilt from the DB
+    # Local questionnaire risk model (services/risk_scoring.py); empty lists → defaults
+    RISK_WEIGHTS: list[float] = []  # per question position, default 1.0 each
+    RISK_THRESHOLDS: list[float] = [0.15, 0.3, 0.45, 0.6, 0.8]  # normalised score for levels 1..5
+    RISK_CRITICAL_ITEMS: list[int] = []  # default: detected from question wording
+    WEEKLY_BATCH_WINDOW: float = 2.0  # seconds to collect weekly-check answers into one AI call
+    WEEKLY_BATCH_MAX: int = 20
+    AI_HEDGE_PERCENTILE: float = 0.95  # hedge when primary is slower than its own p95
+    AI_HEDGE_DEFAULT_DELAY: float = 8.0  # seconds, until enough latency samples exist
+    MODEL_TIERS: dict[str, str] = {"lite": "gemini-2.5-flash-lite", "standard": "gemini-2.5-flash"}
+    # op → tier/max_tokens, plus optional short_* choice for inputs up to short_chars and a
+    # slow_tier used while the tier's p95 latency exceeds latency_budget (services/model_routing.py)
+    MODEL_ROUTES: dict[str, dict] = {
+        # 2.5 Flash counts thinking tokens against max_output_tokens: no tight caps on "standard"
+        "chat": {"tier": "standard", "max_tokens": 4500},
+        "weekly_check": {"tier": "standard",
+                         "short_chars": 200, "short_tier": "lite", "short_max_tokens": 512,
+                         "latency_budget": 20.0, "slow_tier": "lite"},
+        "weekly_check_batch": {"tier": "standard"},
+        "questionnaire": {"tier": "standard"},
+        "chat_summary": {"tier": "lite", "max_tokens": 800},
+    }
+    MODEL_ROUTE_OVERRIDES: dict[str, str] = {}  # op → tier, e.g. {"chat_summary": "standard"}
+    AI_USAGE_RETENTION_DAYS: int = 7  # per user-day AI usage kept in memory for /ai_usage
+    ADMIN_API_TOKEN: str = ""  # bearer token for /ai_usage; empty — endpoint disabled
+    AI_CASSETTE_MODE: str = ""  # "record" | "replay" AI text calls (services/cassette.py); test accounts only
+    AI_CASSETTE_PATH: str = "benchmarks/cassettes/ai.jsonl"
+    AI_CASSETTE_LATENCY_SCALE: float = 1.0  # replay delay = recorded latency × scale
+    # Local crisis pre-screen (services/crisis_classifier.py); empty path disables it
+    CRISIS_CLASSIFIER_PATH: str = "services/models/crisis_classifier.json"
+    CRISIS_CLASSIFIER_THRESHOLD: float = 0.5  # flagged: no batching, hotline numbers if the AI call fails
 
     class Config:
         env_file = ".env"
@@ -1,10 +1,11 @@
 """All Supabase interactions. RPC names match existing SQL functions exactly."""
 import asyncio
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 from supabase import create_client, Client
 
 from config import settings
+from db.state import UserState
 
 _client: Client | None = None
 
@@ -70,6 +71,15 @@ async def update_user_state(user_id: int, **fields) -> None:
     await _run(lambda: client.table("ptsd_user_state").update(fields).eq("user_id", user_id).execute())
 
 
+async def save_user_state(state: UserState, **fields) -> None:
+    """Apply fields to state and write back only what changed. No-op writes are skipped."""
+    if fields:
+        state.set(**fields)
+    changes = state.pop_changes()
+    if changes:
+        await update_user_state(state.user_id, **changes)
+
+
 # ── Lessons ──────────────────────────────────────────────────────────────────
 
 async def get_lesson(lesson_id: str) -> dict | None:
@@ -234,21 +244,105 @@ async def save_questionnaire_analysis(user_id: int, ai_summary: str, risk_level:
     ).execute())
 
 
-# ── AI Chat Logs ──────────────────────────────────────────────────────────────
+async def get_questionnaire_cache(cache_key: str) -> dict | None:
+    client = get_client()
+    result = await _run(
+        lambda: client.table("ptsd_questionnaire_cache")
+        .select("result").eq("cache_key", cache_key).limit(1).execute()
+    )
+    return result.data[0]["result"] if result.data else None
+
+
+async def save_questionnaire_cache(cache_key: str, result: dict) -> None:
+    client = get_client()
+    await _run(lambda: client.table("ptsd_questionnaire_cache").upsert(
+        {"cache_key": cache_key, "result": result},
+        on_conflict="cache_key",
+    ).execute())
 
-async def get_chat_history(user_id: int, limit: int = 20) -> list[dict]:
+
+# ── Voice Transcripts ─────────────────────────────────────────────────────────
+
+async def get_transcript(file_unique_id: str, max_age_seconds: float) -> str | None:
     client = get_client()
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)).isoformat()
     result = await _run(
-        lambda: client.table("ptsd_chat_logs")
-        .select("role, content")
-        .eq("user_id", user_id)
-        .order("created_at", desc=True)
-        .limit(limit)
-        .execute()
+        lambda: client.table("ptsd_transcripts")
+        .select("transcript").eq("file_unique_id", file_unique_id)
+        .gt("created_at", cutoff).limit(1).execute()
     )
+    return result.data[0]["transcript"] if result.data else None
+
+
+async def save_transcript(file_unique_id: str, transcript: str) -> None:
+    client = get_client()
+    await _run(lambda: client.table("ptsd_transcripts").upsert(
+        {"file_unique_id": file_unique_id, "transcript": transcript,
+         "created_at": datetime.now(timezone.utc).isoformat()},
+        on_conflict="file_unique_id",
+    ).execute())
+
+
+# ── AI Chat Logs ──────────────────────────────────────────────────────────────
+
+async def get_chat_history(user_id: int, limit: int = 20, after: str | None = None) -> list[dict]:
+    """Last `limit` messages (oldest first), optionally only those newer than `after`."""
+    client = get_client()
+
+    def _fetch():
+        query = (
+            client.table("ptsd_chat_logs")
+            .select("role, content, created_at")
+            .eq("user_id", user_id)
+        )
+        if after:
+            query = query.gt("created_at", after)
+        return query.order("created_at", desc=True).limit(limit).execute()
+
+    result = await _run(_fetch)
     return list(reversed(result.data))
 
 
+async def get_chat_messages_after(user_id: int, after: str | None, limit: int) -> list[dict]:
+    """Oldest-first messages newer than `after` (used when folding into the summary)."""
+    client = get_client()
+
+    def _fetch():
+        query = (
+            client.table("ptsd_chat_logs")
+            .select("role, content, created_at")
+            .eq("user_id", user_id)
+        )
+        if after:
+            query = query.gt("created_at", after)
+        return query.order("created_at").limit(limit).execute()
+
+    result = await _run(_fetch)
+    return result.data
+
+
+async def get_chat_summary(user_id: int) -> dict | None:
+    client = get_client()
+    result = await _run(
+        lambda: client.table("ptsd_chat_summaries")
+        .select("summary, summarized_until").eq("user_id", user_id).limit(1).execute()
+    )
+    return result.data[0] if result.data else None
+
+
+async def upsert_chat_summary(user_id: int, summary: str, summarized_until: str) -> None:
+    client = get_client()
+    await _run(lambda: client.table("ptsd_chat_summaries").upsert(
+        {
+            "user_id": user_id,
+            "summary": summary,
+            "summarized_until": summarized_until,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        },
+        on_conflict="user_id",
+    ).execute())
+
+
 async def save_chat_message(user_id: int, role: str, content: str,
                              crisis_detected: bool = False, crisis_markers: list | None = None) -> None:
     client = get_client()
@@ -280,6 +374,90 @@ async def upsert_reminder_settings(user_id: int, **fields) -> None:
     ).execute())
 
 
+# ── Pending Actions ───────────────────────────────────────────────────────────
+
+async def put_pending_action(kind: str, actor_id: int, payload: list, ttl_seconds: int) -> None:
+    client = get_client()
+    expires_at = (datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)).isoformat()
+    await _run(lambda: client.table("ptsd_pending_actions").upsert(
+        {"kind": kind, "actor_id": actor_id, "payload": payload, "expires_at": expires_at},
+        on_conflict="kind,actor_id",
+    ).execute())
+
+
+async def get_pending_action_ttl(kind: str, actor_id: int) -> float | None:
+    """Seconds until a live entry expires, None if there is none."""
+    client = get_client()
+    now = datetime.now(timezone.utc)
+    result = await _run(lambda: client.table("ptsd_pending_actions")
+        .select("expires_at")
+        .eq("kind", kind)
+        .eq("actor_id", actor_id)
+        .gt("expires_at", now.isoformat())
+        .limit(1)
+        .execute())
+    if not result.data:
+        return None
+    return (datetime.fromisoformat(result.data[0]["expires_at"]) - now).total_seconds()
+
+
+async def pop_pending_action(kind: str, actor_id: int) -> list | None:
+    """Atomically delete and return a live entry, so two instances can't both consume it."""
+    client = get_client()
+    now = datetime.now(timezone.utc).isoformat()
+    result = await _run(lambda: client.table("ptsd_pending_actions")
+        .delete()
+        .eq("kind", kind)
+        .eq("actor_id", actor_id)
+        .gt("expires_at", now)
+        .execute())
+    return result.data[0]["payload"] if result.data else None
+
+
+# ── Crisis Audit ──────────────────────────────────────────────────────────────
+
+async def scan_page(table: str, columns: str, after, limit: int, key: str = "id") -> list[dict]:
+    """Keyset page: up to `limit` rows with key > `after` (None — from the start), by key."""
+    client = get_client()
+
+    def _fetch():
+        query = client.table(table).select(columns)
+        if after is not None:
+            query = query.gt(key, after)
+        return query.order(key).limit(limit).execute()
+
+    result = await _run(_fetch)
+    return result.data
+
+
+async def mark_crisis(table: str, row_id, markers: list[str] | None = None, key: str = "id") -> None:
+    """Set crisis_detected (and crisis_markers when given) on one row."""
+    client = get_client()
+    fields = {"crisis_detected": True}
+    if markers is not None:
+        fields["crisis_markers"] = markers
+    await _run(lambda: client.table(table).update(fields).eq(key, row_id).execute())
+
+
+async def get_suicide_flags(user_ids: list[int], chunk: int = 200) -> set[int]:
+    """Those of `user_ids` whose state already has suicide_flag set.
+
+    Queried `chunk` ids at a time: the in_() list goes into the URL, which PostgREST
+    (and the proxies in front of it) cap in length.
+    """
+    client = get_client()
+    flagged: set[int] = set()
+    for start in range(0, len(user_ids), chunk):
+        batch = user_ids[start:start + chunk]
+        result = await _run(lambda: client.table("ptsd_user_state")
+            .select("user_id")
+            .in_("user_id", batch)
+            .eq("suicide_flag", True)
+            .execute())
+        flagged.update(row["user_id"] for row in result.data)
+    return flagged
+
+
 # ── Scheduled Task Queries (via existing RPC) ─────────────────────────────────
 
 async def rpc_get_users_for_daily_reminder(hour: int) -> list[dict]:
@@ -0,0 +1,63 @@
+"""Typed view of the merged ptsd_user_state + ptsd_users row with dirty-field tracking."""
+
+_MISSING = object()
+
+
+def lesson_number(module: str | None) -> int | None:
+    """Extract N from a lesson module like 'm3_lesson'. None for non-lesson modules."""
+    if not module or not module.startswith("m") or not module.endswith("_lesson"):
+        return None
+    num = module[1:-len("_lesson")]
+    return int(num) if num.isdigit() else None
+
+
+class UserState:
+    """Parsed once per update; handlers record changes with set() and
+    db.save_user_state() writes back only the fields that actually changed."""
+
+    __slots__ = ("user_id", "module", "phase", "lesson_num", "_row", "_dirty")
+
+    def __init__(self, row: dict):
+        self._row = row
+        self._dirty: dict = {}
+        self.user_id: int = row.get("user_id")
+        self._parse()
+
+    @classmethod
+    def from_row(cls, row: dict | None) -> "UserState | None":
+        return cls(row) if row is not None else None
+
+    def _parse(self) -> None:
+        self.module: str | None = self._row.get("current_module", "idle")
+        self.phase: str | None = self._row.get("current_phase")
+        self.lesson_num: int | None = lesson_number(self.module)
+
+    @property
+    def lesson_id(self) -> str | None:
+        return f"lesson_{self.lesson_num}" if self.lesson_num is not None else None
+
+    @property
+    def first_name(self) -> str:
+        return (self._row.get("ptsd_users") or {}).get("first_name", "боец")
+
+    def get(self, key: str, default=None):
+        """Dict-style read of the raw row (kept for handlers that read arbitrary columns)."""
+        return self._row.get(key, default)
+
+    def set(self, **fields) -> None:
+        """Apply fields locally; only values that differ from the row are marked dirty."""
+        for key, value in fields.items():
+            if self._row.get(key, _MISSING) == value and key not in self._dirty:
+                continue
+            self._row[key] = value
+            self._dirty[key] = value
+        if "current_module" in fields or "current_phase" in fields:
+            self._parse()
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._dirty)
+
+    def pop_changes(self) -> dict:
+        changes, self._dirty = self._dirty, {}
+        return changes
@@ -4,6 +4,7 @@ import logging
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 
 from db import client as db
+from db.state import UserState, lesson_number
 
 logger = logging.getLogger(__name__)
 
@@ -24,52 +25,46 @@ def _rating_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[row1, row2, skip])
 
 
-def _current_lesson_id(module: str) -> str:
-    """Extract lesson_N id from current_module like 'm1_lesson'."""
-    num = module.replace("m", "").replace("_lesson", "")
-    return f"lesson_{num}"
-
-
 def _next_module(current_module: str) -> str | None:
     """Return next module name or None if course complete."""
-    num = int(current_module.replace("m", "").replace("_lesson", ""))
+    num = lesson_number(current_module)
+    if num is None:
+        raise ValueError(f"not a lesson module: {current_module!r}")
     if num >= 10:
         return None
     return f"m{num + 1}_lesson"
 
 
-async def handle(message: Message, callback_data: str, state: dict,
+async def handle(message: Message, callback_data: str, state: UserState,
                  telegram_id: int, first_name: str, **kwargs):
-    module = state.get("current_module", "")
-    phase = state.get("current_phase") or "theory"
+    phase = state.phase or "theory"
 
     if callback_data == "start_course":
-        module = "m1_lesson"
         phase = "theory"
-        await db.update_user_state(telegram_id, current_module=module, current_phase=phase)
+        await db.save_user_state(state, current_module="m1_lesson", current_phase=phase)
 
     # lesson_continue: use current module and phase from state as-is
 
-    lesson_id = _current_lesson_id(module)
-    lesson = await db.get_lesson(lesson_id)
+    lesson_id = state.lesson_id
+    lesson = await db.get_lesson(lesson_id) if lesson_id else None
 
     if not lesson:
         logger.error("Lesson %s not found in DB", lesson_id)
         await message.answer("⚠️ Урок не найден. Обратись к куратору.")
         return
 
-    lesson_num = module.replace("m", "").replace("_lesson", "")
+    lesson_num = state.lesson_num
 
     if callback_data == "lesson_practice":
         phase = "practice"
-        await db.update_user_state(telegram_id, current_phase="practice")
+        await db.save_user_state(state, current_phase="practice")
 
     elif callback_data == "lesson_exercise":
         phase = "exercise"
-        await db.update_user_state(telegram_id, current_phase="exercise")
+        await db.save_user_state(state, current_phase="exercise")
 
     elif callback_data == "lesson_complete":
-        await db.update_user_state(telegram_id, current_phase="awaiting_rating")
+        await db.save_user_state(state, current_phase="awaiting_rating")
         await message.answer(
             "📊 *Оцени своё состояние после упражнения*\n\n"
             "Как ты себя чувствуешь сейчас?\n"
@@ -82,7 +77,7 @@ async def handle(message: Message, callback_data: str, state: dict,
         rating_val = callback_data.replace("rating_", "")
         rating = None if rating_val == "skip" else int(rating_val)
 
-        await db.update_user_state(telegram_id, current_phase="awaiting_report")
+        await db.save_user_state(state, current_phase="awaiting_report")
         await db.upsert_lesson_progress(telegram_id, lesson_id, status="in_progress", rating=rating)
 
         reward = lesson.get("reward_rub", 200)
@@ -122,7 +117,7 @@ async def handle(message: Message, callback_data: str, state: dict,
         case _:
             # Unexpected phase (e.g. awaiting_review, awaiting_rating) — default to theory
             logger.warning("Unexpected phase '%s' in lesson handler for user %s, defaulting to theory", phase, telegram_id)
-            await db.update_user_state(telegram_id, current_phase="theory")
+            await db.save_user_state(state, current_phase="theory")
             await message.answer(
                 f"📖 *Урок {lesson_num}: {lesson['title']}*\n\n"
                 f"{lesson['theory_text']}",
@@ -4,12 +4,14 @@ import logging
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 
 from db import client as db
+from db.state import lesson_number
 from handlers.lesson import _next_module
+from services import pending_actions
 
 logger = logging.getLogger(__name__)
 
-# manager_id → (user_id, lesson_id) — ожидаем ввод причины отклонения
-_pending_rejections: dict[int, tuple[int, str]] = {}
+# manager_id → [user_id, lesson_id] — ожидаем ввод причины отклонения
+pending_rejections = pending_actions.get_store("reject_report")
 
 
 async def handle(message: Message, callback_data: str, telegram_id: int, **kwargs):
@@ -25,7 +27,7 @@ async def handle(message: Message, callback_data: str, telegram_id: int, **kwarg
 
 async def handle_rejection_reason(message: Message, telegram_id: int, text: str, **kwargs):
     """Called when manager types rejection reason after clicking Отклонить."""
-    pending = _pending_rejections.pop(telegram_id, None)
+    pending = await pending_rejections.pop(telegram_id)
     if not pending:
         return
     user_id, lesson_id = pending
@@ -51,7 +53,7 @@ async def _approve(message: Message, user_id: int, lesson_id: str, manager_id: i
                 report_status=None,
             )
             await db.rpc_update_activity_on_lesson(user_id, completed=True)
-            next_num = next_mod.replace("m", "").replace("_lesson", "")
+            next_num = lesson_number(next_mod)
             next_lesson_id = f"lesson_{next_num}"
             next_lesson = await db.get_lesson(next_lesson_id)
 
@@ -100,7 +102,7 @@ async def _approve(message: Message, user_id: int, lesson_id: str, manager_id: i
 
 async def _ask_reject_reason(message: Message, user_id: int, lesson_id: str, manager_id: int):
     """Store pending rejection and ask manager to type reason."""
-    _pending_rejections[manager_id] = (user_id, lesson_id)
+    await pending_rejections.put(manager_id, [user_id, lesson_id])
     await message.answer(
         f"✍️ Напиши причину отклонения отчёта пользователя {user_id} следующим сообщением."
     )
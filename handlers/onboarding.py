@@ -2,6 +2,7 @@
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 
 from db import client as db
+from db.state import UserState
 
 
 def _welcome_keyboard() -> InlineKeyboardMarkup:
@@ -43,15 +44,15 @@ async def handle_new_user(message: Message, telegram_id: int, **kwargs):
     )
 
 
-async def handle_return_user(message: Message, telegram_id: int, first_name: str, state: dict, **kwargs):
+async def handle_return_user(message: Message, telegram_id: int, first_name: str,
+                             state: UserState | None, **kwargs):
     """Welcome back existing user — mirrors 'Format Return Message' node in MASTER_ROUTER_v2."""
-    state = state or {}
-    module = state.get("current_module", "idle")
-    phase = state.get("current_phase")
+    module = state.module if state else "idle"
+    phase = state.phase if state else None
 
     # If user was in AI chat, reset to idle first (mirrors 'Reset State If AI Chat' node)
     if module == "ai_chat":
-        await db.update_user_state(telegram_id, current_module="idle")
+        await db.save_user_state(state, current_module="idle")
         module = "idle"
 
     # Determine context-aware status text and primary action button
@@ -80,7 +81,7 @@ async def handle_return_user(message: Message, telegram_id: int, first_name: str
         status = "Ожидается твой ответ на еженедельную проверку. Напиши свободным текстом как прошла неделя."
         action_btn = InlineKeyboardButton(text="💬 Поговорить с психологом", callback_data="chat_psychologist")
     elif module.startswith("m"):
-        lesson_num = module.replace("m", "").replace("_lesson", "")
+        lesson_num = state.lesson_num
         phase_names = {"theory": "теории", "practice": "практики", "exercise": "упражнения"}
         phase_text = phase_names.get(phase or "theory", "занятия")
         status = f"Урок {lesson_num}. Ты на этапе {phase_text}."
@@ -102,7 +103,7 @@ async def handle_return_user(message: Message, telegram_id: int, first_name: str
 
 
 async def handle(message: Message, callback_data: str, telegram_id: int,
-                 first_name: str, **kwargs):
+                 first_name: str, state: UserState, **kwargs):
     """Handle all onboarding callbacks."""
     match callback_data:
         case "onboarding_accept" | "restart_onboarding":
@@ -130,7 +131,7 @@ async def handle(message: Message, callback_data: str, telegram_id: int,
             )
 
         case "consent_yes":
-            await db.update_user_state(telegram_id, current_module="idle")
+            await db.save_user_state(state, current_module="idle")
             await message.answer(
                 "✅ *Отлично!*\n\n"
                 "Выбери удобное время для ежедневных напоминаний о занятиях:",
@@ -138,7 +139,7 @@ async def handle(message: Message, callback_data: str, telegram_id: int,
             )
 
         case "consent_no" | "pause_onboarding":
-            await db.update_user_state(telegram_id, current_module="idle")
+            await db.save_user_state(state, current_module="idle")
             await message.answer(
                 "Понял. Если захочешь вернуться — просто напиши /start.\n\n"
                 "Программа будет ждать тебя. 🎖️"
@@ -146,7 +147,7 @@ async def handle(message: Message, callback_data: str, telegram_id: int,
 
         case "reminder_morning":
             await db.upsert_reminder_settings(telegram_id, reminder_time_preference="morning", reminder_hour=9)
-            await db.update_user_state(telegram_id, current_module="screening", screening_question_index=0)
+            await db.save_user_state(state, current_module="screening", screening_question_index=0)
             await message.answer(
                 "✅ Напоминания настроены на *9:00*.\n\n"
                 "Теперь пройдём короткую анкету — это поможет оценить твоё текущее состояние "
@@ -159,7 +160,7 @@ async def handle(message: Message, callback_data: str, telegram_id: int,
 
         case "reminder_evening":
             await db.upsert_reminder_settings(telegram_id, reminder_time_preference="evening", reminder_hour=20)
-            await db.update_user_state(telegram_id, current_module="screening", screening_question_index=0)
+            await db.save_user_state(state, current_module="screening", screening_question_index=0)
             await message.answer(
                 "✅ Напоминания настроены на *20:00*.\n\n"
                 "Теперь пройдём короткую анкету — это поможет оценить твоё текущее состояние.\n\n"
@@ -3,19 +3,24 @@ import logging
 
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 
+from config import settings
 from db import client as db
-from services import openai_service
+from db.state import UserState
+from services import chat_sessions, crisis_classifier, openai_service
+from services.admission import BUSY_MESSAGE, Overloaded
 from services.crisis import detect_crisis, handle_crisis, CRISIS_MESSAGE
+from services.rate_limit import RATE_LIMITED_MESSAGE, limiter
+from services.telegram_stream import StreamingReply
 
 logger = logging.getLogger(__name__)
 
 
-async def handle(message: Message, callback_data: str, state: dict,
-                 telegram_id: int, text: str, **kwargs):
+async def handle(message: Message, callback_data: str, state: UserState,
+                 telegram_id: int, text: str, first_name: str, **kwargs):
     # Entry point — switching to ai_chat mode (button or /chat_psychologist command)
     if callback_data == "chat_psychologist" or text == "/chat_psychologist":
-        prev_module = state.get("current_module", "idle")
-        await db.update_user_state(telegram_id,
+        prev_module = state.module
+        await db.save_user_state(state,
             current_module="ai_chat",
             ai_chat_return_module=prev_module,
         )
@@ -31,9 +36,8 @@ async def handle(message: Message, callback_data: str, state: dict,
 
     if callback_data == "return_to_lesson":
         return_module = state.get("ai_chat_return_module") or "idle"
-        await db.update_user_state(telegram_id, current_module=return_module)
-        fresh_state = await db.get_user_state(telegram_id)
-        first_name = (state.get("ptsd_users") or {}).get("first_name", "боец")
+        await db.save_user_state(state, current_module=return_module)
+        fresh_state = UserState.from_row(await db.get_user_state(telegram_id))
         from handlers.onboarding import handle_return_user
         await handle_return_user(
             message=message,
@@ -52,37 +56,108 @@ async def handle(message: Message, callback_data: str, state: dict,
         await message.answer("Напиши мне что-нибудь или отправь голосовое.")
         return
 
-    first_name = (state.get("ptsd_users") or {}).get("first_name", "боец")
-
     # Crisis detection
     markers = detect_crisis(text)
     crisis_detected = bool(markers)
 
     if crisis_detected:
-        await db.save_chat_message(telegram_id, "user", text,
-                                    crisis_detected=True, crisis_markers=markers)
-        await handle_crisis(message.bot, telegram_id, message.chat.id)
-        await db.save_chat_message(telegram_id, "assistant", CRISIS_MESSAGE, crisis_detected=True)
+        await _crisis(message, telegram_id, text, markers)
         return
 
-    # Fetch history BEFORE saving current message — prevents current message
+    # Local pre-screen: a likely crisis is marked in the log and, if the AI is unavailable,
+    # gets the hotline numbers instead of a "try later" — never the crisis flow on its own
+    screen = crisis_classifier.prescreen(text, "chat")
+    flagged = screen is not None and screen.flagged
+    user_markers = ["classifier"] if flagged else None
+
+    # Limited only here: the crisis check above must run on every message
+    if not limiter.allow(telegram_id, "psychologist"):
+        await message.answer(RATE_LIMITED_MESSAGE)
+        return
+
+    # Build context BEFORE saving current message — prevents current message
     # from appearing both in history[] and as user_message (would cause duplicate context)
-    history = await db.get_chat_history(telegram_id)
-    messages_for_ai = [{"role": h["role"], "content": h["content"]} for h in history]
+    messages_for_ai = await chat_sessions.context(telegram_id)
+
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[[
+        InlineKeyboardButton(text="🔙 К занятиям", callback_data="return_to_lesson"),
+    ]])
+
+    if settings.STREAM_PSYCHOLOGIST:
+        response = await _stream_reply(message, messages_for_ai, text, first_name, keyboard, flagged)
+        if response is None:
+            if flagged:
+                await _flagged_without_reply(message, telegram_id, text)
+            return
+        await db.save_chat_message(telegram_id, "user", text, crisis_markers=user_markers)
+        await db.save_chat_message(telegram_id, "assistant", response)
+        chat_sessions.append(telegram_id, text, response)
+        return
 
     try:
         response = await openai_service.chat_with_psychologist(messages_for_ai, text, first_name)
+    except Overloaded:
+        if flagged:
+            await _flagged_without_reply(message, telegram_id, text)
+        else:
+            await message.answer(BUSY_MESSAGE)
+        return
     except Exception as e:
         logger.error("Psychologist call failed: %s", e)
-        await message.answer("⚠️ Временная ошибка. Попробуй чуть позже.")
+        if flagged:
+            await _flagged_without_reply(message, telegram_id, text)
+        else:
+            await message.answer("⚠️ Временная ошибка. Попробуй чуть позже.")
         return
 
-    await db.save_chat_message(telegram_id, "user", text)
+    await db.save_chat_message(telegram_id, "user", text, crisis_markers=user_markers)
     await db.save_chat_message(telegram_id, "assistant", response)
+    chat_sessions.append(telegram_id, text, response)
+
+    await message.answer(response, reply_markup=keyboard)
 
-    await message.answer(
-        response,
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=[[
-            InlineKeyboardButton(text="🔙 К занятиям", callback_data="return_to_lesson"),
-        ]]),
-    )
+
+async def _crisis(message: Message, telegram_id: int, text: str, markers: list[str]) -> None:
+    await db.save_chat_message(telegram_id, "user", text,
+                                crisis_detected=True, crisis_markers=markers)
+    await handle_crisis(message.bot, telegram_id, message.chat.id)
+    await db.save_chat_message(telegram_id, "assistant", CRISIS_MESSAGE, crisis_detected=True)
+    chat_sessions.invalidate(telegram_id)
+
+
+async def _flagged_without_reply(message: Message, telegram_id: int, text: str) -> None:
+    """AI unavailable for a classifier-flagged message: log it and show the hotlines.
+
+    Unlike _crisis, the user's state (crisis_hold, suicide_flag) is left untouched.
+    """
+    await db.save_chat_message(telegram_id, "user", text, crisis_markers=["classifier"])
+    await message.answer(CRISIS_MESSAGE)
+
+
+async def _stream_reply(message: Message, history: list[dict], text: str, first_name: str,
+                        keyboard: InlineKeyboardMarkup, quiet_failure: bool = False) -> str | None:
+    """Stream the answer into progressively edited messages. None if the call failed
+    or produced no text (empty or blocked stream), like _text on the non-streaming path.
+
+    With quiet_failure the caller handles a failure itself, so no error message is sent.
+    """
+    reply = StreamingReply(message, settings.STREAM_EDIT_INTERVAL, reply_markup=keyboard)
+    await reply.start()
+    try:
+        async for chunk in openai_service.chat_with_psychologist_stream(history, text, first_name):
+            await reply.feed(chunk)
+    except Overloaded:
+        if not quiet_failure:
+            await message.answer(BUSY_MESSAGE)
+        return None
+    except Exception as e:
+        logger.error("Psychologist stream failed: %s", e)
+        if not quiet_failure:
+            await message.answer("⚠️ Временная ошибка. Попробуй чуть позже.")
+        return None
+    if not reply.text.strip():
+        logger.error("Psychologist stream failed: empty model response")
+        if not quiet_failure:
+            await message.answer("⚠️ Временная ошибка. Попробуй чуть позже.")
+        return None
+    return await reply.finish()
@@ -5,7 +5,8 @@ import logging
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 
 from db import client as db
-from services import openai_service
+from db.state import UserState
+from services import questionnaire_cache, risk_scoring
 from services.crisis import handle_crisis
 
 logger = logging.getLogger(__name__)
@@ -18,12 +19,12 @@ def _answer_keyboard() -> InlineKeyboardMarkup:
     ]])
 
 
-async def handle(message: Message, callback_data: str, state: dict,
+async def handle(message: Message, callback_data: str, state: UserState,
                  telegram_id: int, first_name: str, **kwargs):
     current_index = state.get("screening_question_index", 0)
 
     if callback_data == "start_questionnaire":
-        await db.update_user_state(telegram_id, screening_question_index=0, current_module="screening")
+        await db.save_user_state(state, screening_question_index=0, current_module="screening")
         current_index = 0
     # questionnaire_continue — resume from current index, no reset
 
@@ -32,7 +33,7 @@ async def handle(message: Message, callback_data: str, state: dict,
         answer_text = "Да" if callback_data == "answer_yes" else "Нет"
         await db.save_questionnaire_answer(telegram_id, current_index, answer_text)
         current_index += 1
-        await db.update_user_state(telegram_id, screening_question_index=current_index)
+        await db.save_user_state(state, screening_question_index=current_index)
 
     questions = await db.get_questions()
     total = len(questions)
@@ -40,7 +41,7 @@ async def handle(message: Message, callback_data: str, state: dict,
     if current_index >= total:
         # Set module away from "screening" immediately to prevent re-triggering
         # if user sends any message while background analysis is running
-        await db.update_user_state(telegram_id, current_module="complete")
+        await db.save_user_state(state, current_module="complete")
         await _run_analysis(message, telegram_id, first_name)
         return
 
@@ -54,61 +55,110 @@ async def handle(message: Message, callback_data: str, state: dict,
 
 
 async def _run_analysis(message: Message, user_id: int, first_name: str):
-    """Trigger GPT-4 analysis after all 32 answers collected."""
+    """Score locally and respond at once; the AI summary follows in the background."""
+    try:
+        answers = await db.get_questionnaire_answers(user_id)
+        model = await risk_scoring.get_model()
+        local = model.score(answers)
+        await db.save_questionnaire_analysis(
+            user_id, "", local.risk_level, local.risk_factors, local.suicide_indicators)
+    except Exception as e:
+        logger.error("Questionnaire scoring failed for user %s: %s", user_id, e)
+        await message.answer(
+            "⚠️ Произошла ошибка при анализе. Попробуй позже или обратись к куратору."
+        )
+        return
+
+    if local.suicide_indicators or local.risk_level >= 4:
+        await db.update_user_state(user_id,
+            current_module="crisis_hold",
+            risk_level=local.risk_level,
+            suicide_flag=local.suicide_indicators,
+        )
+        await handle_crisis(message.bot, user_id, message.chat.id)
+        asyncio.create_task(_enrich(message, user_id, first_name, answers, local, notify=False))
+        return
+
+    await db.update_user_state(user_id,
+        current_module="complete",
+        risk_level=local.risk_level,
+        suicide_flag=False,
+    )
+
+    factors_text = "\n".join(f"• {f}" for f in local.risk_factors) if local.risk_factors else "—"
     await message.answer(
-        "✅ *Анкета завершена!*\n\n"
-        "Анализирую твои ответы... Это займёт около минуты. ⏳"
+        f"✅ *Анкета завершена!*\n\n"
+        f"📊 *Уровень стресса:* {local.risk_level}/5 — {_risk_level_text(local.risk_level)}\n\n"
+        f"*Выявленные факторы:*\n{factors_text}\n\n"
+        "_Подробный разбор от психолога пришлю следующим сообщением._",
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=[[
+            InlineKeyboardButton(text="▶️ Начать курс реабилитации", callback_data="start_course"),
+        ]]),
     )
-    asyncio.create_task(_analyze_and_respond(message, user_id, first_name))
+    asyncio.create_task(_enrich(message, user_id, first_name, answers, local, notify=True))
 
 
-async def _analyze_and_respond(message: Message, user_id: int, first_name: str):
-    """Background task: GPT-4 analysis → save → send result."""
-    try:
-        answers = await db.get_questionnaire_answers(user_id)
+ENRICH_FALLBACK = (
+    "📋 Подробный разбор сейчас подготовить не получилось. Результаты выше сохранены — "
+    "можно начинать курс, а с вопросами обратись к куратору."
+)
 
-        result = await openai_service.analyze_questionnaire(answers, first_name)
 
-        risk_level = result.get("risk_level", 0)
-        ai_summary = result.get("ai_summary", "")
-        risk_factors = result.get("risk_factors", [])
-        suicide_indicators = result.get("suicide_indicators", False)
+async def _enrich(message: Message, user_id: int, first_name: str, answers: list[dict],
+                  local: risk_scoring.RiskScore, notify: bool):
+    """Background task: AI summary → save alongside the local score → send to the user.
 
-        await db.save_questionnaire_analysis(user_id, ai_summary, risk_level, risk_factors, suicide_indicators)
-
-        if suicide_indicators or risk_level >= 4:
+    Risk level and routing stay with the local model; the AI can only escalate to crisis.
+    Runs as a fire-and-forget task, so nothing may escape it: on any failure the user who
+    was promised the summary gets ENRICH_FALLBACK instead.
+    """
+    try:
+        result = await questionnaire_cache.analyze(answers, first_name)
+        if not isinstance(result, dict):
+            raise ValueError(f"analysis is {type(result).__name__}, not an object")
+
+        ai_summary = result.get("ai_summary") or ""
+        risk_factors = result.get("risk_factors")
+        if not isinstance(risk_factors, list) or not risk_factors:
+            risk_factors = local.risk_factors
+        ai_suicide = bool(result.get("suicide_indicators"))
+        ai_crisis = ai_suicide or _ai_risk_level(result.get("risk_level")) >= 4
+        suicide_indicators = local.suicide_indicators or ai_suicide
+
+        await db.save_questionnaire_analysis(
+            user_id, ai_summary, local.risk_level, risk_factors, suicide_indicators)
+
+        if ai_crisis and notify:
             await db.update_user_state(user_id,
                 current_module="crisis_hold",
-                risk_level=risk_level,
                 suicide_flag=suicide_indicators,
             )
             await handle_crisis(message.bot, user_id, message.chat.id)
             return
 
-        risk_text = _risk_level_text(risk_level)
-        factors_text = "\n".join(f"• {f}" for f in risk_factors) if risk_factors else "—"
+        if notify and ai_summary:
+            factors_text = "\n".join(f"• {f}" for f in risk_factors) if risk_factors else "—"
+            await message.answer(
+                f"📋 *Разбор анкеты*\n\n{ai_summary}\n\n*Выявленные факторы:*\n{factors_text}"
+            )
+            return
+        if notify:
+            await message.answer(ENRICH_FALLBACK)
+    except Exception as e:
+        logger.error("Questionnaire enrichment failed for user %s: %s", user_id, e)
+        if notify:
+            try:
+                await message.answer(ENRICH_FALLBACK)
+            except Exception as send_error:
+                logger.error("Questionnaire fallback not sent to user %s: %s", user_id, send_error)
 
-        await db.update_user_state(user_id,
-            current_module="complete",
-            risk_level=risk_level,
-            suicide_flag=False,
-        )
 
-        await message.answer(
-            f"📊 *Результаты анализа*\n\n"
-            f"{ai_summary}\n\n"
-            f"*Уровень стресса:* {risk_level}/5 — {risk_text}\n\n"
-            f"*Выявленные факторы:*\n{factors_text}",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[[
-                InlineKeyboardButton(text="▶️ Начать курс реабилитации", callback_data="start_course"),
-            ]]),
-        )
-
-    except Exception as e:
-        logger.error("Questionnaire analysis failed for user %s: %s", user_id, e)
-        await message.answer(
-            "⚠️ Произошла ошибка при анализе. Попробуй позже или обратись к куратору."
-        )
+def _ai_risk_level(value) -> int:
+    """The AI's risk_level as an int; 0 when missing or not a number."""
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
 
 
 def _risk_level_text(level: int) -> str:
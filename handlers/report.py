@@ -5,17 +5,17 @@ from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 
 from config import settings
 from db import client as db
+from db.state import UserState
 from services.crisis import detect_crisis, handle_crisis
 
 logger = logging.getLogger(__name__)
 
 
-async def handle(message: Message, state: dict, telegram_id: int,
+async def handle(message: Message, state: UserState, telegram_id: int,
                  text: str, transcript: str | None, **kwargs):
     """Accept voice or text lesson report."""
-    module = state.get("current_module", "")
-    lesson_num = module.replace("m", "").replace("_lesson", "")
-    lesson_id = f"lesson_{lesson_num}"
+    lesson_num = state.lesson_num
+    lesson_id = state.lesson_id
 
     progress = await db.get_lesson_progress(telegram_id)
     lesson_progress = next((p for p in progress if p.get("lesson_id") == lesson_id), None)
@@ -43,7 +43,7 @@ async def handle(message: Message, state: dict, telegram_id: int,
         rating=rating,
     )
 
-    await db.update_user_state(telegram_id,
+    await db.save_user_state(state,
         current_phase="awaiting_review",
         report_status="awaiting_review",
     )
@@ -58,7 +58,7 @@ async def handle(message: Message, state: dict, telegram_id: int,
 
 
 async def _notify_managers(message: Message, user_id: int, lesson_id: str,
-                            lesson_num: str, report_text: str, rating: int | None):
+                            lesson_num: int, report_text: str, rating: int | None):
     """Send report to manager group with approve/reject buttons."""
     user = message.chat
     first_name = user.first_name or "боец"
@@ -96,12 +96,12 @@ async def _notify_managers(message: Message, user_id: int, lesson_id: str,
         logger.error("Failed to notify managers: %s", e)
 
 
-async def remind_review(message: Message, state: dict, telegram_id: int, **kwargs):
+async def remind_review(message: Message, state: UserState, telegram_id: int, **kwargs):
     """Resend pending report to manager group as a reminder (triggered by user)."""
-    from handlers.lesson import _next_module, _current_lesson_id
-    module = state.get("current_module", "")
-    lesson_num = module.replace("m", "").replace("_lesson", "")
-    lesson_id = f"lesson_{lesson_num}"
+    from handlers.lesson import _next_module
+    module = state.module
+    lesson_num = state.lesson_num
+    lesson_id = state.lesson_id
 
     report = await db.get_lesson_report(telegram_id, lesson_id)
 
@@ -112,12 +112,12 @@ async def remind_review(message: Message, state: dict, telegram_id: int, **kwarg
             # Auto-fix stuck state: advance to next lesson
             next_mod = _next_module(module)
             if next_mod:
-                await db.update_user_state(telegram_id,
+                await db.save_user_state(state,
                     current_module=next_mod,
                     current_phase="theory",
                     report_status=None,
                 )
-                next_num = next_mod.replace("m", "").replace("_lesson", "")
+                next_num = state.lesson_num
                 next_lesson = await db.get_lesson(f"lesson_{next_num}")
                 await message.answer(
                     f"✅ Твой отчёт уже был принят куратором!\n\nНачинаем урок {next_num} 🎖️",
@@ -131,7 +131,7 @@ async def remind_review(message: Message, state: dict, telegram_id: int, **kwarg
                         ]]),
                     )
             else:
-                await db.update_user_state(telegram_id, current_module="course_complete", current_phase=None)
+                await db.save_user_state(state, current_module="course_complete", current_phase=None)
                 await message.answer("🎖️ Твой отчёт принят и курс завершён! Поздравляю!")
         else:
             await message.answer("⚠️ Отчёт не найден. Возможно, куратор уже проверяет его.")
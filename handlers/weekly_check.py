@@ -5,26 +5,79 @@ from datetime import date
 
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 
+from config import settings
 from db import client as db
-from services import openai_service
-from services.crisis import handle_crisis
+from db.state import UserState
+from services import crisis_classifier, openai_service
+from services.batching import MicroBatcher
+from services.admission import BUSY_MESSAGE, Overloaded
+from services.crisis import CRISIS_MESSAGE, detect_crisis, handle_crisis
+from services.rate_limit import RATE_LIMITED_MESSAGE, limiter
 
 logger = logging.getLogger(__name__)
 
+# Sunday 19:00 prompts everyone at once — answers arriving together share one Gemini call
+_analysis_batcher = MicroBatcher(
+    "weekly_check",
+    batch_fn=openai_service.analyze_weekly_checks_batch,
+    single_fn=openai_service.analyze_weekly_check,
+    window=settings.WEEKLY_BATCH_WINDOW,
+    max_size=settings.WEEKLY_BATCH_MAX,
+)
 
-async def handle(message: Message, state: dict, telegram_id: int, text: str, **kwargs):
+
+def _local_result(screen: crisis_classifier.Prescreen | None) -> dict:
+    """Analysis result when Gemini gave none: sentiment from the local pre-screen.
+
+    crisis_detected stays False — the classifier alone never starts the crisis flow.
+    """
+    if screen is None:
+        return {"ai_analysis": "", "sentiment_score": 0, "crisis_detected": False}
+    return {"ai_analysis": "", "sentiment_score": round(screen.sentiment), "crisis_detected": False}
+
+
+async def handle(message: Message, state: UserState, telegram_id: int, text: str, **kwargs):
     """Handle user's text response to weekly check question."""
     if not text:
         await message.answer("Напиши как ты себя чувствуешь на этой неделе.")
         return
 
+    prev_module = state.get("current_module_before_weekly") or "idle"
+
+    # Keyword crisis check first — it must not depend on AI capacity
+    if detect_crisis(text):
+        await db.save_weekly_check(telegram_id, text, "", 0, True)
+        await db.save_user_state(state, current_module=prev_module)
+        await handle_crisis(message.bot, telegram_id, message.chat.id)
+        return
+
+    # Limited only here: the crisis check above must run on every answer
+    if not limiter.allow(telegram_id, "weekly_check"):
+        await message.answer(RATE_LIMITED_MESSAGE)
+        return
+
+    # Local pre-screen: a likely crisis skips the batch window and, if the AI is unavailable,
+    # is saved with the local result and shown the hotline numbers instead of a "try later"
+    screen = crisis_classifier.prescreen(text, "weekly_check")
+    flagged = screen is not None and screen.flagged
+
     await message.answer("⏳ Записываю и анализирую...")
 
+    ai_failed = False
     try:
-        result = await openai_service.analyze_weekly_check(text)
+        if flagged:
+            result = await openai_service.analyze_weekly_check(text)
+        else:
+            result = await _analysis_batcher.submit(text)
+    except Overloaded:
+        if not flagged:
+            # Stay in weekly_check so the user can simply resend the answer
+            await message.answer(BUSY_MESSAGE)
+            return
+        result, ai_failed = _local_result(screen), True
     except Exception as e:
         logger.error("Weekly check analysis failed: %s", e)
-        result = {"ai_analysis": "", "sentiment_score": 0, "crisis_detected": False}
+        result, ai_failed = _local_result(screen), True
 
     sentiment = result.get("sentiment_score", 0)
     crisis = result.get("crisis_detected", False)
@@ -32,13 +85,16 @@ async def handle(message: Message, state: dict, telegram_id: int, text: str, **k
 
     await db.save_weekly_check(telegram_id, text, analysis, sentiment, crisis)
 
-    prev_module = state.get("current_module_before_weekly") or "idle"
-    await db.update_user_state(telegram_id, current_module=prev_module)
+    await db.save_user_state(state, current_module=prev_module)
 
     if crisis:
         await handle_crisis(message.bot, telegram_id, message.chat.id)
         return
 
+    if flagged and ai_failed:
+        # No second opinion: show the hotlines, leave the state alone
+        await message.answer(CRISIS_MESSAGE)
+
     await message.answer(
         "✅ Спасибо за честный ответ.\n\n"
         f"{analysis}\n\n"
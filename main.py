@@ -1,6 +1,8 @@
 import asyncio
+import hmac
 import logging
 import os
+from datetime import date
 
 from aiohttp import web
 from aiogram import Bot, Dispatcher
@@ -10,6 +12,7 @@ from aiogram.enums import ParseMode
 from config import settings
 from router import main_router
 from schedulers.tasks import setup_scheduler
+from services import ai_usage, metrics
 
 logging.basicConfig(
     level=logging.INFO,
@@ -18,14 +21,48 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def health_server():
-    """Minimal HTTP server for Railway health checks."""
+WEBHOOK_PATH = "/webhook"
+
+
+def create_bot() -> Bot:
+    return Bot(
+        token=settings.BOT_TOKEN,
+        default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN),
+    )
+
+
+async def health_server(webhook_handler=None, worker_metrics=None):
+    """Minimal HTTP server for Railway health checks (and the sharded-mode webhook).
+
+    worker_metrics: in sharded mode, returns the workers' metric snapshots for /metrics.
+    """
     async def handle(request):
         return web.Response(text="OK")
 
+    async def handle_metrics(request):
+        return web.Response(text=metrics.render(worker_metrics() if worker_metrics else None))
+
+    async def handle_ai_usage(request):
+        # per-user data: only with the admin token, and not served at all without one
+        if not settings.ADMIN_API_TOKEN:
+            return web.Response(status=404)
+        auth = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(auth, f"Bearer {settings.ADMIN_API_TOKEN}"):
+            return web.Response(status=401)
+        day = request.query.get("day")
+        try:
+            report = ai_usage.report(date.fromisoformat(day) if day else None)
+        except ValueError:
+            return web.Response(status=400, text="day must be YYYY-MM-DD")
+        return web.json_response(report)
+
     app = web.Application()
     app.router.add_get("/", handle)
     app.router.add_get("/health", handle)
+    app.router.add_get("/metrics", handle_metrics)
+    app.router.add_get("/ai_usage", handle_ai_usage)
+    if webhook_handler is not None:
+        app.router.add_post(WEBHOOK_PATH, webhook_handler)
 
     runner = web.AppRunner(app)
     await runner.setup()
@@ -37,10 +74,11 @@ async def health_server():
 
 
 async def main():
-    bot = Bot(
-        token=settings.BOT_TOKEN,
-        default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN),
-    )
+    if settings.WORKERS > 0:
+        await main_sharded()
+        return
+
+    bot = create_bot()
     dp = Dispatcher()
     dp.include_router(main_router)
 
@@ -59,5 +97,43 @@ async def main():
         await bot.session.close()
 
 
+async def main_sharded():
+    """Ingress process: receives updates, runs the scheduler; workers run main_router."""
+    from workers import ALLOWED_UPDATES, ShardedIngress
+
+    if settings.WEBHOOK_URL and not settings.WEBHOOK_SECRET:
+        raise RuntimeError("WEBHOOK_SECRET must be set when WEBHOOK_URL is used")
+
+    bot = create_bot()
+    ingress = ShardedIngress(settings.WORKERS)
+    ingress.start()
+
+    scheduler = setup_scheduler(bot)
+    scheduler.start()
+    logger.info("Scheduler started with %d jobs", len(scheduler.get_jobs()))
+
+    runner = await health_server(ingress.webhook_handler if settings.WEBHOOK_URL else None,
+                                 ingress.worker_metrics)
+
+    try:
+        if settings.WEBHOOK_URL:
+            await bot.set_webhook(
+                settings.WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+                allowed_updates=ALLOWED_UPDATES,
+                secret_token=settings.WEBHOOK_SECRET,
+            )
+            logger.info("Sharded ingress started (%d workers), webhook...", settings.WORKERS)
+            await asyncio.Event().wait()
+        else:
+            await bot.delete_webhook()
+            logger.info("Sharded ingress started (%d workers), polling...", settings.WORKERS)
+            await ingress.poll(settings.BOT_TOKEN)
+    finally:
+        scheduler.shutdown()
+        ingress.stop()
+        await runner.cleanup()
+        await bot.session.close()
+
+
 if __name__ == "__main__":
     asyncio.run(main())
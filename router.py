@@ -5,38 +5,88 @@ from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 
 from db import client as db
+from config import settings
+from db.state import UserState
+from services import ai_usage
+from services.admission import BUSY_MESSAGE, Overloaded
 from services.crisis import detect_crisis, handle_crisis
+from services.rate_limit import RATE_LIMITED_MESSAGE, RateLimited, limiter
+from services.voice_download import VoiceTooLarge
 
 logger = logging.getLogger(__name__)
 main_router = Router()
 
 
-async def _get_voice_text(message: Message) -> str | None:
+TRANSCRIBING_MESSAGE = "🎙 Распознаю голосовое…"
+VOICE_TOO_LARGE_MESSAGE = "❌ Голосовое слишком большое. Запиши, пожалуйста, покороче или напиши текстом."
+
+
+class VoiceAck:
+    """The "recognising…" message for a voice note, edited in place with the outcome."""
+
+    def __init__(self, message: Message):
+        self.message = message
+        self.ack: Message | None = None
+
+    async def start(self) -> None:
+        self.ack = await self.message.answer(TRANSCRIBING_MESSAGE)
+
+    async def reply(self, text: str, parse_mode: str | None = None) -> None:
+        if self.ack is not None:
+            try:
+                await self.ack.edit_text(text, parse_mode=parse_mode)
+                return
+            except Exception:
+                pass
+        await self.message.answer(text, parse_mode=parse_mode)
+
+    async def done(self, transcript: str) -> None:
+        if self.ack is not None:
+            preview = transcript if len(transcript) <= 500 else transcript[:500] + "…"
+            await self.reply(f"🎙 «{preview}»")
+
+
+async def _get_voice_text(message: Message, ack: VoiceAck) -> str | None:
     """Download and transcribe voice message. Returns None if not a voice."""
     if not message.voice:
         return None
-    from services.openai_service import transcribe
-    file = await message.bot.get_file(message.voice.file_id)
-    file_bytes = await message.bot.download_file(file.file_path)
-    return await transcribe(file_bytes.read(), "voice.ogg")
+    from services import transcript_cache, voice_download
+    from services.transcription_pool import pool
+    from services.voice_transcription import transcribe_voice
 
+    voice_download.check_size(message.voice)
 
-def _determine_routing(state: dict | None, callback: str, text: str, telegram_id: int = 0) -> str:
+    async def download_and_transcribe() -> str:
+        async with voice_download.fetch(message.bot, message.voice) as audio:
+            return await transcribe_voice(audio)
+
+    async def transcribe_in_pool() -> str:
+        # Only a cache miss pays for the round trip, so only a miss takes a token and gets
+        # the acknowledgement; a cached transcript goes on to the handlers' crisis check
+        if not limiter.allow(message.from_user.id, "transcription"):
+            raise RateLimited()
+        await ack.start()
+        return await pool.submit(download_and_transcribe, duration=message.voice.duration or 0)
+
+    return await transcript_cache.get_or_transcribe(message.voice.file_unique_id, transcribe_in_pool)
+
+
+def _determine_routing(state: UserState | None, callback: str, text: str, telegram_id: int = 0) -> str:
     """Pure routing logic. Maps to Determine Routing node in MASTER_ROUTER_v2."""
     # Manager callbacks bypass state check — managers may not have a bot state
     if (callback.startswith("approve_report_") or callback.startswith("reject_report_")):
         return "manager_review"
 
     # Manager typing rejection reason (text message after clicking Отклонить)
-    from handlers.manager import _pending_rejections
-    if telegram_id in _pending_rejections and text:
+    from handlers.manager import pending_rejections
+    if text and pending_rejections.contains(telegram_id):
         return "manager_reject_reason"
 
     if state is None:
         return "new_user"
 
-    module = state.get("current_module", "idle")
-    phase = state.get("current_phase")
+    module = state.module
+    phase = state.phase
 
     # /start always shows return menu — must be before any module-based routing
     if text == "/start":
@@ -93,20 +143,38 @@ def _determine_routing(state: dict | None, callback: str, text: str, telegram_id
 @main_router.message()
 async def handle_message(message: Message):
     telegram_id = message.from_user.id
+    ai_usage.current_user.set(telegram_id)
     text = message.text or ""
 
     # Transcribe voice if needed
     transcript = None
     if message.voice:
+        ack = VoiceAck(message)
         try:
-            transcript = await _get_voice_text(message)
+            transcript = await _get_voice_text(message, ack)
             text = transcript or ""
+        except Overloaded:
+            await ack.reply(BUSY_MESSAGE)
+            return
+        except RateLimited:
+            await ack.reply(RATE_LIMITED_MESSAGE)
+            return
+        except VoiceTooLarge:
+            await ack.reply(VOICE_TOO_LARGE_MESSAGE)
+            return
         except Exception as e:
             logger.error("Voice transcription failed: %s", e)
-            await message.answer("❌ Не удалось распознать голосовое. Попробуй ещё раз или напиши текстом.")
+            await ack.reply("❌ Не удалось распознать голосовое. Попробуй ещё раз или напиши текстом.")
             return
+        await ack.done(text)
+
+    # Rejection reasons are typed in the manager group; only there can a pending
+    # action created by another instance be waiting for this sender
+    if message.chat.id == settings.MANAGER_GROUP_CHAT_ID:
+        from handlers.manager import pending_rejections
+        await pending_rejections.refresh(telegram_id)
 
-    state = await db.get_user_state(telegram_id)
+    state = UserState.from_row(await db.get_user_state(telegram_id))
     routing = _determine_routing(state, "", text, telegram_id)
     await _dispatch(message, state, routing, text, transcript, callback_data="", telegram_id=telegram_id)
 
@@ -114,6 +182,7 @@ async def handle_message(message: Message):
 @main_router.callback_query()
 async def handle_callback(callback: CallbackQuery):
     telegram_id = callback.from_user.id
+    ai_usage.current_user.set(telegram_id)
     callback_data = callback.data or ""
 
     await callback.answer()  # Remove loading spinner
@@ -124,12 +193,12 @@ async def handle_callback(callback: CallbackQuery):
     except Exception:
         pass  # continueOnFail: true
 
-    state = await db.get_user_state(telegram_id)
+    state = UserState.from_row(await db.get_user_state(telegram_id))
     routing = _determine_routing(state, callback_data, "", telegram_id)
     await _dispatch(callback.message, state, routing, "", None, callback_data=callback_data, telegram_id=telegram_id)
 
 
-async def _dispatch(message: Message, state: dict | None, routing: str,
+async def _dispatch(message: Message, state: UserState | None, routing: str,
                     text: str, transcript: str | None, callback_data: str,
                     telegram_id: int | None = None):
     """Dispatch to the appropriate handler module."""
@@ -149,7 +218,7 @@ async def _dispatch(message: Message, state: dict | None, routing: str,
         "callback_data": callback_data,
         "telegram_id": effective_id,
         "user_id": effective_id,
-        "first_name": (state or {}).get("ptsd_users", {}).get("first_name", "боец") if state else "боец",
+        "first_name": state.first_name if state else "боец",
     }
 
     match routing:
@@ -193,15 +262,15 @@ async def _dispatch(message: Message, state: dict | None, routing: str,
             await _send_idle_menu(message, state)
 
 
-async def _send_idle_menu(message: Message, state: dict | None):
+async def _send_idle_menu(message: Message, state: UserState | None):
     from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
     if not state:
         return
 
-    module = state.get("current_module", "idle")
-    first_name = state.get("ptsd_users", {}).get("first_name", "боец") if state else "боец"
-    total_rewards = state.get("ptsd_users", {}).get("total_rewards", 0) if state else 0
+    module = state.module
+    first_name = state.first_name
+    total_rewards = (state.get("ptsd_users") or {}).get("total_rewards", 0)
 
     if module == "course_complete":
         text = f"🎖️ *{first_name}, ты завершил программу!*\n\nНакоплено наград: *{total_rewards}₽*"
@@ -209,8 +278,7 @@ async def _send_idle_menu(message: Message, state: dict | None):
             InlineKeyboardButton(text="💬 Поговорить с психологом", callback_data="chat_psychologist"),
         ]])
     elif module and module.startswith("m"):
-        lesson_num = module.replace("m", "").replace("_lesson", "")
-        text = f"👋 *{first_name}*, продолжаем реабилитацию.\n\nТекущий урок: *{lesson_num}*"
+        text = f"👋 *{first_name}*, продолжаем реабилитацию.\n\nТекущий урок: *{state.lesson_num}*"
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
             [InlineKeyboardButton(text="▶️ Продолжить урок", callback_data="lesson_continue")],
             [InlineKeyboardButton(text="💬 Психолог", callback_data="chat_psychologist")],
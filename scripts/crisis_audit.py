@@ -0,0 +1,207 @@
+"""Re-scan stored user texts with the current crisis keyword detector.
+
+Pages through ptsd_chat_logs (user messages), ptsd_lesson_reports and ptsd_weekly_checks
+by primary key (keyset pagination, `id > last` — no OFFSET, so every page costs the same),
+runs detect_crisis_batch over each page and collects rows the detector flags now but that
+were not stored as crisis. Only one page (plus the next one being fetched) is in memory;
+what grows is the list of new hits (row id and markers) and the per-user summary.
+
+After every page the position and the summary so far are written atomically to the
+checkpoint file, so an interrupted audit resumes where it stopped and still reports
+everything. Delete the checkpoint (or pass --restart) to audit from scratch, e.g. after
+CRISIS_PATTERNS changed. It holds short excerpts of user texts: delete it once done.
+
+    python scripts/crisis_audit.py [--checkpoint path] [--page 500] [--restart]
+    python scripts/crisis_audit.py --apply --markers суицид,... [--checkpoint path]
+
+A run without --apply only reports: hits per marker, a few sample matches for each, and the
+per-user summary. Review the samples, then rerun with --apply and the markers that held up.
+That run scans whatever is left, then sets crisis_detected (and crisis_markers on chat logs)
+on the recorded hits that carry an approved marker. Rows are written only after they are in
+the checkpoint, and each written row is recorded, so an interrupted --apply picks up where it
+stopped. Lesson reports have no crisis column and are only reported. A lesson report that is
+resubmitted keeps its id, so edits made after it was scanned are not re-read.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import client as db  # noqa: E402
+from services.crisis import CRISIS_KEYWORDS, detect_crisis_batch, find_crisis  # noqa: E402
+
+DEFAULT_CHECKPOINT = "crisis_audit.checkpoint.json"
+SAMPLES_PER_MARKER = 5
+SAMPLE_CONTEXT = 40  # characters shown around a match
+
+
+@dataclass
+class Source:
+    table: str
+    columns: str
+    text_fields: tuple[str, ...]
+    stored_flag: str | None  # column holding the write-time verdict, None if the table has none
+    role: str | None = None  # only rows with this role (chat logs: the user's side)
+    markers_column: bool = False
+
+
+SOURCES = [
+    Source("ptsd_chat_logs", "id, user_id, role, content, crisis_detected, created_at",
+           ("content",), "crisis_detected", role="user", markers_column=True),
+    Source("ptsd_lesson_reports", "id, user_id, lesson_id, report_text, voice_transcript, submitted_at",
+           ("report_text", "voice_transcript"), None),
+    Source("ptsd_weekly_checks", "id, user_id, user_response, crisis_detected, created_at",
+           ("user_response",), "crisis_detected"),
+]
+
+
+class Checkpoint:
+    def __init__(self, path: str):
+        self.path = path
+        self.state = {"started_at": time.time(), "sources": {}, "users": {}, "samples": {}}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    def source(self, table: str) -> dict:
+        return self.state["sources"].setdefault(
+            table, {"after": None, "scanned": 0, "new_hits": 0, "done": False, "hits": []})
+
+    def add_hit(self, table: str, row: dict, markers: list[str], text: str) -> None:
+        # [row id, markers, written by --apply]
+        self.source(table)["hits"].append([row["id"], markers, False])
+        for match in find_crisis(text):
+            samples = self.state["samples"].setdefault(match.keyword, [])
+            if len(samples) < SAMPLES_PER_MARKER:
+                start = max(0, match.start - SAMPLE_CONTEXT)
+                excerpt = " ".join(text[start:match.end + SAMPLE_CONTEXT].split())
+                samples.append(f"{table}#{row['id']}: …{excerpt}…")
+        user = self.state["users"].setdefault(str(row["user_id"]), {
+            "hits": 0, "tables": {}, "markers": {}, "first": None, "last": None})
+        user["hits"] += 1
+        user["tables"][table] = user["tables"].get(table, 0) + 1
+        for marker in markers:
+            user["markers"][marker] = user["markers"].get(marker, 0) + 1
+        when = row.get("created_at") or row.get("submitted_at")
+        if when:
+            user["first"] = min(user["first"] or when, when)
+            user["last"] = max(user["last"] or when, when)
+
+    def save(self) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+async def audit_source(source: Source, checkpoint: Checkpoint, page_size: int) -> None:
+    progress = checkpoint.source(source.table)
+    if progress["done"]:
+        return
+    pending = asyncio.create_task(db.scan_page(source.table, source.columns, progress["after"], page_size))
+    while True:
+        rows = await pending
+        if not rows:
+            break
+        # fetch the next page while this one is scanned
+        pending = asyncio.create_task(db.scan_page(source.table, source.columns, rows[-1]["id"], page_size))
+
+        candidates = [r for r in rows if source.role is None or r.get("role") == source.role]
+        texts = ["\n".join(r.get(f) or "" for f in source.text_fields) for r in candidates]
+        for row, text, markers in zip(candidates, texts, detect_crisis_batch(texts)):
+            if not markers or (source.stored_flag and row.get(source.stored_flag)):
+                continue
+            checkpoint.add_hit(source.table, row, markers, text)
+            progress["new_hits"] += 1
+
+        progress["scanned"] += len(rows)
+        progress["after"] = rows[-1]["id"]
+        checkpoint.save()
+        print(f"{source.table}: {progress['scanned']} rows, {progress['new_hits']} new hits", file=sys.stderr)
+    pending.cancel()
+    progress["done"] = True
+    checkpoint.save()
+
+
+async def apply_marks(source: Source, checkpoint: Checkpoint, approved: set[str],
+                      save_every: int = 100) -> int:
+    """Write the recorded hits of `source` that carry an approved marker; returns rows written."""
+    if not source.stored_flag:
+        return 0
+    written = 0
+    for hit in checkpoint.source(source.table)["hits"]:
+        row_id, markers, done = hit
+        markers = [m for m in markers if m in approved]
+        if done or not markers:
+            continue
+        await db.mark_crisis(source.table, row_id, markers if source.markers_column else None)
+        hit[2] = True
+        written += 1
+        if written % save_every == 0:
+            checkpoint.save()
+    checkpoint.save()
+    return written
+
+
+async def report(checkpoint: Checkpoint) -> None:
+    users = checkpoint.state["users"]
+    already = await db.get_suicide_flags([int(u) for u in users])
+    print(f"{'table':<22}{'scanned':>10}{'new hits':>10}{'written':>10}")
+    for table, progress in checkpoint.state["sources"].items():
+        written = sum(hit[2] for hit in progress["hits"])
+        print(f"{table:<22}{progress['scanned']:>10}{progress['new_hits']:>10}{written:>10}")
+    counts: dict[str, int] = {}
+    for progress in checkpoint.state["sources"].values():
+        for _, markers, _ in progress["hits"]:
+            for marker in markers:
+                counts[marker] = counts.get(marker, 0) + 1
+    print("\nhits per marker (review the samples before --apply --markers ...):")
+    for marker, n in sorted(counts.items(), key=lambda x: -x[1]):
+        print(f"  {marker:<18}{n:>6}")
+        for sample in checkpoint.state["samples"].get(marker, []):
+            print(f"      {sample}")
+    print(f"\n{len(users)} users with newly flagged texts "
+          f"({sum(int(u) not in already for u in users)} without suicide_flag):")
+    ranked = sorted(users.items(), key=lambda item: item[1]["hits"], reverse=True)
+    for user_id, info in ranked:
+        markers = ", ".join(f"{m}×{n}" for m, n in sorted(info["markers"].items(), key=lambda x: -x[1]))
+        tables = ", ".join(f"{t.removeprefix('ptsd_')}×{n}" for t, n in info["tables"].items())
+        flag = "flagged" if int(user_id) in already else "NEW"
+        print(f"  {user_id:>12}  {flag:<8}{info['hits']:>4}  {tables}  [{markers}]  "
+              f"{info['first'] or '?'} … {info['last'] or '?'}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--page", type=int, default=500)
+    parser.add_argument("--apply", action="store_true")
+    parser.add_argument("--markers", default="", help="comma-separated markers reviewed for --apply")
+    parser.add_argument("--restart", action="store_true")
+    args = parser.parse_args()
+    approved = {m.strip() for m in args.markers.split(",") if m.strip()}
+    if args.apply and not approved:
+        parser.error("--apply needs --markers: review the dry-run samples first")
+    unknown = approved - set(CRISIS_KEYWORDS)
+    if unknown:
+        parser.error(f"unknown markers: {', '.join(sorted(unknown))}")
+
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    checkpoint = Checkpoint(args.checkpoint)
+    for source in SOURCES:
+        await audit_source(source, checkpoint, args.page)
+    if args.apply:
+        for source in SOURCES:
+            written = await apply_marks(source, checkpoint, approved)
+            print(f"{source.table}: {written} rows marked", file=sys.stderr)
+    await report(checkpoint)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
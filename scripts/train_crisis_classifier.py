@@ -0,0 +1,195 @@
+"""Train the local crisis / sentiment pre-screen (services/crisis_classifier.py).
+
+Reads a labelled JSONL fixture ({"text", "crisis": 0|1, "sentiment": −5..5} per line),
+reports stratified k-fold cross-validation against the keyword detector, then trains on
+everything and writes the model JSON plus a Markdown evaluation report.
+
+    python scripts/train_crisis_classifier.py [fixture] [--out model.json] [--report report.md]
+
+Plain Python SGD: the fixture is hundreds of lines and features are sparse, so training
+takes seconds and the bot needs no numeric dependencies.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.crisis import detect_crisis  # noqa: E402
+from services.crisis_classifier import CrisisClassifier, Linear, features, sigmoid  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_FIXTURE = os.path.join(ROOT, "scripts", "fixtures", "crisis_sentiment_labelled.jsonl")
+DEFAULT_OUT = os.path.join(ROOT, "services", "models", "crisis_classifier.json")
+DEFAULT_REPORT = os.path.join(ROOT, "services", "models", "crisis_classifier_report.md")
+
+
+def load(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _sgd(xs: list[dict[int, float]], targets: list[float], loss: str, epochs: int, lr: float,
+         l2: float, weights: list[float], seed: int) -> Linear:
+    model = Linear(0.0, {})
+    w = model.weights
+    order = list(range(len(xs)))
+    rnd = random.Random(seed)
+    for epoch in range(epochs):
+        rnd.shuffle(order)
+        step = lr / (1 + epoch * 0.05)
+        for n in order:
+            x, y = xs[n], targets[n]
+            z = model(x)
+            grad = ((sigmoid(z) if loss == "logistic" else z) - y) * weights[n]
+            model.bias -= step * grad
+            for i, v in x.items():
+                wi = w.get(i, 0.0)
+                w[i] = wi - step * (grad * v + l2 * wi)
+    return model
+
+
+def train(rows: list[dict], dim: int, epochs: int, seed: int = 0) -> CrisisClassifier:
+    xs = [features(r["text"], dim) for r in rows]
+    labels = [float(r["crisis"]) for r in rows]
+    positives = sum(labels) or 1.0
+    negatives = (len(labels) - sum(labels)) or 1.0
+    # balanced class weights: crises are the minority and the costly miss
+    balance = [len(rows) / (2 * positives) if y else len(rows) / (2 * negatives) for y in labels]
+    crisis = _sgd(xs, labels, "logistic", epochs, 0.5, 1e-4, balance, seed)
+    sentiment = _sgd(xs, [float(r["sentiment"]) for r in rows], "squared", epochs, 0.1, 1e-4,
+                     [1.0] * len(rows), seed)
+    return CrisisClassifier(dim, crisis, sentiment)
+
+
+def folds(rows: list[dict], k: int, seed: int = 0) -> list[list[int]]:
+    """Stratified: crisis and non-crisis rows are dealt round-robin into k folds."""
+    rnd = random.Random(seed)
+    out: list[list[int]] = [[] for _ in range(k)]
+    for label in (0, 1):
+        idx = [i for i, r in enumerate(rows) if r["crisis"] == label]
+        rnd.shuffle(idx)
+        for j, i in enumerate(idx):
+            out[j % k].append(i)
+    return out
+
+
+def _binary(flags: list[bool], labels: list[int]) -> dict:
+    tp = sum(f and y for f, y in zip(flags, labels))
+    fp = sum(f and not y for f, y in zip(flags, labels))
+    fn = sum(not f and y for f, y in zip(flags, labels))
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": round(precision, 3), "recall": round(recall, 3), "f1": round(f1, 3),
+            "false_positives": fp, "missed": fn}
+
+
+def _auc(scores: list[float], labels: list[int]) -> float:
+    pos = [s for s, y in zip(scores, labels) if y]
+    neg = [s for s, y in zip(scores, labels) if not y]
+    wins = sum((p > n) + 0.5 * (p == n) for p in pos for n in neg)
+    return round(wins / (len(pos) * len(neg)), 3) if pos and neg else 0.0
+
+
+def evaluate(rows: list[dict], dim: int, epochs: int, k: int, threshold: float) -> dict:
+    probs = [0.0] * len(rows)
+    sentiments = [0.0] * len(rows)
+    mean_baseline = [0.0] * len(rows)
+    for fold in folds(rows, k):
+        held = set(fold)
+        train_rows = [r for i, r in enumerate(rows) if i not in held]
+        model = train(train_rows, dim, epochs)
+        mean = statistics.fmean(r["sentiment"] for r in train_rows)
+        for i in fold:
+            result = model.score(rows[i]["text"])
+            probs[i], sentiments[i], mean_baseline[i] = result.crisis_probability, result.sentiment, mean
+
+    labels = [r["crisis"] for r in rows]
+    keyword = [bool(detect_crisis(r["text"])) for r in rows]
+    classifier = [p >= threshold for p in probs]
+    truth = [r["sentiment"] for r in rows]
+    return {
+        "rows": len(rows),
+        "crisis_rows": sum(labels),
+        "folds": k,
+        "threshold": threshold,
+        "auc": _auc(probs, labels),
+        "keyword": _binary(keyword, labels),
+        "classifier": _binary(classifier, labels),
+        "keyword_or_classifier": _binary([a or b for a, b in zip(keyword, classifier)], labels),
+        "sentiment_mae": round(statistics.fmean(abs(p - t) for p, t in zip(sentiments, truth)), 2),
+        "sentiment_mae_mean_baseline": round(statistics.fmean(abs(m - t) for m, t in zip(mean_baseline, truth)), 2),
+    }
+
+
+def _score_micros(model: CrisisClassifier, rows: list[dict], repeat: int = 20) -> float:
+    texts = [r["text"] for r in rows]
+    model.score(texts[0])
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            model.score(text)
+    return (time.perf_counter() - start) / (repeat * len(texts)) * 1e6
+
+
+def report_markdown(fixture: str, ev: dict, micros: float) -> str:
+    lines = [
+        "# Crisis pre-screen — evaluation",
+        "",
+        f"Fixture: `{os.path.relpath(fixture, ROOT)}` — {ev['rows']} texts, {ev['crisis_rows']} crisis.",
+        f"Stratified {ev['folds']}-fold cross-validation, threshold {ev['threshold']}, ROC AUC {ev['auc']}.",
+        "",
+        "| detector | precision | recall | F1 | false positives | missed |",
+        "|---|---|---|---|---|---|",
+    ]
+    for name in ("keyword", "classifier", "keyword_or_classifier"):
+        m = ev[name]
+        lines.append(f"| {name} | {m['precision']} | {m['recall']} | {m['f1']} | "
+                     f"{m['false_positives']} | {m['missed']} |")
+    lines += [
+        "",
+        f"Sentiment MAE: {ev['sentiment_mae']} (predicting the training mean: "
+        f"{ev['sentiment_mae_mean_baseline']}).",
+        "",
+        f"Scoring: {micros:.0f} µs per text (final model, warm feature cache).",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("fixture", nargs="?", default=DEFAULT_FIXTURE)
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--report", default=DEFAULT_REPORT)
+    parser.add_argument("--dim", type=int, default=1 << 18)
+    parser.add_argument("--epochs", type=int, default=40)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    args = parser.parse_args()
+    if args.dim & (args.dim - 1):
+        parser.error("--dim must be a power of two")
+
+    rows = load(args.fixture)
+    ev = evaluate(rows, args.dim, args.epochs, args.folds, args.threshold)
+    model = train(rows, args.dim, args.epochs)
+    model.meta = {"trained_rows": len(rows), "evaluation": ev}
+    micros = _score_micros(model, rows)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(model.to_json(), f, ensure_ascii=False, separators=(",", ":"))
+    report = report_markdown(args.fixture, ev, micros)
+    with open(args.report, "w", encoding="utf-8") as f:
+        f.write(report)
+    print(report)
+    print(f"model: {args.out} ({os.path.getsize(args.out) // 1024} KiB)")
+
+
+if __name__ == "__main__":
+    main()
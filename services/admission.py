@@ -0,0 +1,137 @@
+"""Admission control for AI calls: caps in-flight work, queues by priority, sheds excess.
+
+Each op belongs to a priority class (interactive > normal > background) with its own
+concurrency limit under the global AI_MAX_IN_FLIGHT. A freed slot goes to the waiter with
+the best effective priority — its class minus one step per AI_PRIORITY_AGING seconds
+waited — so background work is delayed by interactive traffic but never starved.
+
+Crisis handling never goes through here — detect_crisis/handle_crisis are local and
+handlers run them before asking for an AI slot.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from config import settings
+from services import metrics
+
+BUSY_MESSAGE = "⏳ Сейчас очень много обращений. Попробуй ещё раз через пару минут."
+
+PRIORITIES = ("interactive", "normal", "background")
+INTERACTIVE, NORMAL, BACKGROUND = range(len(PRIORITIES))
+
+OP_PRIORITY = {
+    "chat": INTERACTIVE,
+    "transcription": INTERACTIVE,
+    "weekly_check": NORMAL,
+    "weekly_check_batch": BACKGROUND,
+    "questionnaire": BACKGROUND,
+    "chat_summary": BACKGROUND,
+}
+
+
+class Overloaded(Exception):
+    """AI capacity is saturated; the caller should reply with BUSY_MESSAGE."""
+
+
+class _Waiter:
+    __slots__ = ("priority", "enqueued", "future", "granted")
+
+    def __init__(self, priority: int, future: asyncio.Future):
+        self.priority = priority
+        self.enqueued = time.monotonic()
+        self.future = future
+        self.granted = False  # a slot was counted for this waiter and must be released
+
+
+class AdmissionController:
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float,
+                 class_limits: dict[str, int] | None = None, aging: float = 30.0):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.aging = aging
+        limits = class_limits or {}
+        self.class_limits = [limits.get(name, max_in_flight) for name in PRIORITIES]
+        self._in_flight = 0
+        self._class_in_flight = [0] * len(PRIORITIES)
+        self._waiters: list[_Waiter] = []
+
+    def _effective(self, waiter: _Waiter, now: float) -> float:
+        return waiter.priority - (now - waiter.enqueued) / self.aging
+
+    def _dispatch(self) -> None:
+        """Hand free slots to the best runnable waiters."""
+        now = time.monotonic()
+        # a deadline or task cancellation cancels the future at once, before the waiter's own
+        # cleanup runs — such waiters must not be handed a slot
+        if any(w.future.done() for w in self._waiters):
+            self._waiters = [w for w in self._waiters if not w.future.done()]
+        while self._waiters and self._in_flight < self.max_in_flight:
+            runnable = [w for w in self._waiters
+                        if self._class_in_flight[w.priority] < self.class_limits[w.priority]]
+            if not runnable:
+                break
+            waiter = min(runnable, key=lambda w: (self._effective(w, now), w.enqueued))
+            self._waiters.remove(waiter)
+            self._in_flight += 1
+            self._class_in_flight[waiter.priority] += 1
+            waiter.granted = True
+            waiter.future.set_result(None)
+        self._publish()
+
+    def _release(self, priority: int) -> None:
+        self._in_flight -= 1
+        self._class_in_flight[priority] -= 1
+        self._dispatch()
+
+    def _publish(self) -> None:
+        for p, name in enumerate(PRIORITIES):
+            metrics.set_gauge("ai_queue_depth", sum(1 for w in self._waiters if w.priority == p),
+                              priority=name)
+            metrics.set_gauge("ai_in_flight", self._class_in_flight[p], priority=name)
+
+    @asynccontextmanager
+    async def admit(self, op: str, timeout: float | None = None):
+        """Hold one AI slot for the duration of the block. Raises Overloaded when shed."""
+        priority = OP_PRIORITY.get(op, NORMAL)
+        waiter = _Waiter(priority, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        self._dispatch()
+
+        if not waiter.future.done() and len(self._waiters) > self.max_queue:
+            self._waiters.remove(waiter)
+            self._publish()
+            metrics.inc("ai_shed", op=op, priority=PRIORITIES[priority], reason="queue_full")
+            raise Overloaded(op)
+
+        try:
+            async with asyncio.timeout(timeout or self.queue_timeout):
+                await waiter.future
+        except BaseException as e:
+            if waiter.granted:
+                self._release(priority)  # granted at the same moment we gave up
+            else:
+                if waiter in self._waiters:  # _dispatch may already have dropped it
+                    self._waiters.remove(waiter)
+                self._publish()
+            if isinstance(e, TimeoutError):
+                metrics.inc("ai_shed", op=op, priority=PRIORITIES[priority], reason="deadline")
+                raise Overloaded(op) from None
+            raise
+        metrics.observe("ai_queue_seconds", time.monotonic() - waiter.enqueued,
+                        op=op, priority=PRIORITIES[priority])
+
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+
+ai = AdmissionController(
+    max_in_flight=settings.AI_MAX_IN_FLIGHT,
+    max_queue=settings.AI_MAX_QUEUE,
+    queue_timeout=settings.AI_QUEUE_TIMEOUT,
+    class_limits=settings.AI_PRIORITY_LIMITS,
+    aging=settings.AI_PRIORITY_AGING,
+)
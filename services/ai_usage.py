@@ -0,0 +1,136 @@
+"""Per-call token and latency accounting for AI calls.
+
+openai_service fills one CallRecord per logical call (hedged duplicates count as retries)
+and hands it to record(). Per-op/model totals go to services/metrics (/metrics); per
+user-day and per op-day totals are kept in memory for AI_USAGE_RETENTION_DAYS and served
+as JSON at /ai_usage, behind the ADMIN_API_TOKEN bearer token. The user is taken from
+current_user, set by the router per update and inherited by background tasks it spawns.
+"""
+import contextvars
+import logging
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from config import settings
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+current_user: contextvars.ContextVar[int | None] = contextvars.ContextVar("ai_user", default=None)
+# the latest call recorded in this context — lets a caller see which provider/model answered
+last_call: contextvars.ContextVar["CallRecord | None"] = contextvars.ContextVar("ai_last_call", default=None)
+
+
+@dataclass
+class Usage:
+    input_tokens: int = 0
+    output_tokens: int = 0  # billed output: response + thinking tokens
+    cached_tokens: int = 0
+    thinking_tokens: int = 0  # part of output_tokens
+
+
+@dataclass
+class CallRecord:
+    op: str
+    model: str = ""
+    provider: str = ""
+    usage: Usage | None = None
+    ttft: float | None = None
+    latency: float = 0.0
+    attempts: int = 0
+    parse_failures: int = 0
+    ok: bool = False
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.attempts - 1)
+
+
+def gemini_usage(response) -> Usage | None:
+    meta = getattr(response, "usage_metadata", None)
+    if meta is None:
+        return None
+    thinking = getattr(meta, "thoughts_token_count", None) or 0
+    return Usage(
+        input_tokens=meta.prompt_token_count or 0,
+        output_tokens=(meta.candidates_token_count or 0) + thinking,
+        cached_tokens=meta.cached_content_token_count or 0,
+        thinking_tokens=thinking,
+    )
+
+
+# (day, user_id) / (day, op) → [calls, input_tokens, output_tokens, latency_seconds]
+_by_user_day: dict[tuple[date, int], list[float]] = {}
+_by_op_day: dict[tuple[date, str], list[float]] = {}
+_last_pruned: date | None = None
+
+
+def _add(table: dict, key, rec: CallRecord) -> None:
+    row = table.get(key)
+    if row is None:
+        row = table[key] = [0, 0, 0, 0.0]
+    row[0] += 1
+    if rec.usage:
+        row[1] += rec.usage.input_tokens
+        row[2] += rec.usage.output_tokens
+    row[3] += rec.latency
+
+
+def _prune(today: date) -> None:
+    global _last_pruned
+    if _last_pruned == today:
+        return
+    _last_pruned = today
+    cutoff = today - timedelta(days=settings.AI_USAGE_RETENTION_DAYS)
+    for table in (_by_user_day, _by_op_day):
+        for key in [k for k in table if k[0] < cutoff]:
+            del table[key]
+
+
+def record(rec: CallRecord) -> None:
+    last_call.set(rec)
+    labels = {"op": rec.op, "model": rec.model or "unknown"}
+    metrics.inc("ai_calls", outcome="ok" if rec.ok else "error", **labels)
+    metrics.observe("ai_call_seconds", rec.latency, **labels)
+    if rec.ttft is not None:
+        metrics.observe("ai_ttft_seconds", rec.ttft, **labels)
+    if rec.usage:
+        metrics.inc("ai_input_tokens", rec.usage.input_tokens, **labels)
+        metrics.inc("ai_output_tokens", rec.usage.output_tokens, **labels)
+        metrics.inc("ai_cached_tokens", rec.usage.cached_tokens, **labels)
+        metrics.inc("ai_thinking_tokens", rec.usage.thinking_tokens, **labels)
+    if rec.retries:
+        metrics.inc("ai_retries", rec.retries, op=rec.op)
+    if rec.parse_failures:
+        metrics.inc("ai_parse_failures", rec.parse_failures, op=rec.op)
+
+    today = date.today()
+    _prune(today)
+    _add(_by_op_day, (today, rec.op), rec)
+    user_id = current_user.get()
+    if user_id is not None:
+        _add(_by_user_day, (today, user_id), rec)
+
+    logger.debug("ai_call op=%s model=%s provider=%s in=%s out=%s ttft=%s latency=%.2f retries=%d parse_failures=%d",
+                 rec.op, rec.model, rec.provider,
+                 rec.usage.input_tokens if rec.usage else None,
+                 rec.usage.output_tokens if rec.usage else None,
+                 rec.ttft, rec.latency, rec.retries, rec.parse_failures)
+
+
+def _row(row: list[float]) -> dict:
+    return {"calls": int(row[0]), "input_tokens": int(row[1]), "output_tokens": int(row[2]),
+            "latency_seconds": round(row[3], 3)}
+
+
+def report(day: date | None = None, top: int = 50) -> dict:
+    """Per-op totals and the heaviest users (by total tokens) for one day."""
+    day = day or date.today()
+    users = [(uid, row) for (d, uid), row in _by_user_day.items() if d == day]
+    users.sort(key=lambda item: item[1][1] + item[1][2], reverse=True)
+    return {
+        "day": day.isoformat(),
+        "by_op": {op: _row(row) for (d, op), row in sorted(_by_op_day.items()) if d == day},
+        "top_users": [{"user_id": uid, **_row(row)} for uid, row in users[:top]],
+        "users": len(users),
+    }
@@ -0,0 +1,83 @@
+"""Micro-batching: collect concurrent requests for a short window and serve them in one call.
+
+batch_fn(items) must return one result per item in order. If it fails with a parse-type
+error (bad JSON, missing items, wrong shape) every item is retried through single_fn;
+other errors (timeouts, overload) are propagated to all waiters unchanged.
+"""
+import asyncio
+import logging
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+# json.JSONDecodeError is a ValueError
+PARSE_ERRORS = (ValueError, KeyError, TypeError)
+
+
+class MicroBatcher:
+    def __init__(self, name: str, batch_fn, single_fn, window: float, max_size: int):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.single_fn = single_fn
+        self.window = window
+        self.max_size = max_size
+        self._pending: list[tuple[object, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[object, asyncio.Future]]) -> None:
+        items = [item for item, _ in batch]
+        metrics.observe("batch_size", len(items), batcher=self.name)
+        if len(batch) == 1:
+            await self._run_single(*batch[0])
+            return
+        try:
+            results = await self.batch_fn(items)
+            if len(results) != len(items):
+                raise ValueError(f"expected {len(items)} results, got {len(results)}")
+        except PARSE_ERRORS as e:
+            logger.warning("%s batch of %d unusable (%s), falling back to single calls",
+                           self.name, len(items), e)
+            metrics.inc("batch_fallback", batcher=self.name)
+            await asyncio.gather(*(self._run_single(item, fut) for item, fut in batch))
+            return
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+
+        for (_, fut), result in zip(batch, results):
+            if not fut.done():
+                fut.set_result(result)
+
+    async def _run_single(self, item, fut: asyncio.Future) -> None:
+        try:
+            result = await self.single_fn(item)
+        except Exception as e:
+            if not fut.done():
+                fut.set_exception(e)
+            return
+        if not fut.done():
+            fut.set_result(result)
@@ -0,0 +1,89 @@
+"""Record/replay of AI text calls ("cassettes") for offline benchmarks and regression runs.
+
+RecordingProvider wraps a live provider and appends every call to a JSONL cassette: op,
+system prompt, messages, json_mode, the response with model and usage, and the measured
+latency. ReplayProvider serves those responses locally, sleeping for the recorded latency
+times a scale factor (0 = instant). Requests are matched by op + system + messages +
+json_mode; repeated identical requests replay their recordings in order.
+
+Cassettes contain full prompts and answers — record with test accounts only, never on
+production traffic. Enabled through AI_CASSETTE_MODE ("record" | "replay").
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from pathlib import Path
+
+from services.ai_usage import Usage
+from services.providers import Completion, ProviderError, ProviderHealth
+
+
+def request_key(op: str, system: str, messages: list[dict], json_mode: bool = False) -> str:
+    raw = json.dumps([op, system, messages, json_mode], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def load(path: str | Path) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class RecordingProvider:
+    """Pass-through to `inner` that appends each successful call to the cassette."""
+
+    def __init__(self, inner, path: str | Path):
+        self.inner = inner
+        self.name = inner.name
+        self.health = inner.health
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    async def generate(self, op: str, system: str, messages: list[dict], **kwargs) -> Completion:
+        start = time.monotonic()
+        completion = await self.inner.generate(op, system, messages, **kwargs)
+        json_mode = kwargs.get("json_mode", False)
+        entry = {
+            "key": request_key(op, system, messages, json_mode),
+            "op": op,
+            "system": system,
+            "messages": messages,
+            "json_mode": json_mode,
+            "response": completion.text,
+            "model": completion.model,
+            "usage": vars(completion.usage) if completion.usage else None,
+            "latency": round(time.monotonic() - start, 4),
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return completion
+
+
+class ReplayProvider:
+    """Serves recorded responses with the original latency times latency_scale."""
+
+    def __init__(self, entries: list[dict], latency_scale: float = 1.0, name: str = "replay"):
+        self.name = name
+        self.latency_scale = latency_scale
+        self.health = ProviderHealth(name)
+        self._by_key: dict[str, deque[dict]] = defaultdict(deque)
+        for entry in entries:
+            self._by_key[entry["key"]].append(entry)
+
+    @classmethod
+    def from_file(cls, path: str | Path, latency_scale: float = 1.0) -> "ReplayProvider":
+        return cls(load(path), latency_scale)
+
+    async def generate(self, op: str, system: str, messages: list[dict], **kwargs) -> Completion:
+        recordings = self._by_key.get(request_key(op, system, messages, kwargs.get("json_mode", False)))
+        if not recordings:
+            raise ProviderError(f"no recording for {op} request")
+        entry = recordings[0]
+        recordings.rotate(-1)
+        if self.latency_scale:
+            await asyncio.sleep(entry["latency"] * self.latency_scale)
+        usage = Usage(**entry["usage"]) if entry.get("usage") else None
+        return Completion(entry["response"], entry["model"], usage)
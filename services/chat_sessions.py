@@ -0,0 +1,71 @@
+"""Live psychologist chat sessions kept in memory between turns.
+
+A Gemini chat session is only its history, so a session here is the context list itself:
+summary turn pair + recent turns. A hit skips the two DB reads and the rebuild in
+chat_summary.load; each finished turn appends one user/assistant pair and trims the
+oldest turns back into CHAT_CONTEXT_TOKEN_BUDGET. Sessions idle for CHAT_SESSION_IDLE
+seconds are rebuilt from stored history; a summary fold or a crisis turn invalidates one.
+At most CHAT_SESSION_MAX sessions are kept (LRU).
+"""
+import time
+from collections import OrderedDict
+
+from config import settings
+from services import chat_summary, metrics
+from services.chat_summary import estimate_tokens, fit_to_budget
+
+
+class _Session:
+    __slots__ = ("prefix", "prefix_tokens", "turns", "pending", "last_used")
+
+    def __init__(self, prefix: list[dict], turns: list[dict], pending: int):
+        self.prefix = prefix
+        self.prefix_tokens = sum(estimate_tokens(m["content"]) for m in prefix)
+        self.turns = turns
+        self.pending = pending
+        self.last_used = time.monotonic()
+
+
+_sessions: OrderedDict[int, _Session] = OrderedDict()
+
+
+async def context(user_id: int) -> list[dict]:
+    """History for the next psychologist call, from the live session or rebuilt on a miss."""
+    session = _sessions.get(user_id)
+    now = time.monotonic()
+    if session is not None and now - session.last_used <= settings.CHAT_SESSION_IDLE:
+        metrics.inc("chat_session", outcome="hit")
+        session.last_used = now
+        _sessions.move_to_end(user_id)
+        return session.prefix + session.turns
+
+    metrics.inc("chat_session", outcome="expired" if session is not None else "miss")
+    prefix, recent, pending = await chat_summary.load(user_id)
+    session = _Session(prefix, recent, pending)
+    _sessions[user_id] = session
+    _sessions.move_to_end(user_id)
+    while len(_sessions) > settings.CHAT_SESSION_MAX:
+        _sessions.popitem(last=False)
+    metrics.set_gauge("chat_sessions", len(_sessions))
+
+    if pending >= settings.CHAT_SUMMARY_TRIGGER_TURNS:
+        chat_summary.schedule_fold(user_id)
+    return session.prefix + session.turns
+
+
+def append(user_id: int, user_text: str, reply: str) -> None:
+    """Add a finished turn (already saved to the DB) to the user's live session."""
+    session = _sessions.get(user_id)
+    if session is None:
+        return
+    session.turns.append({"role": "user", "content": user_text})
+    session.turns.append({"role": "assistant", "content": reply})
+    session.turns = fit_to_budget(session.turns, settings.CHAT_CONTEXT_TOKEN_BUDGET - session.prefix_tokens)
+    session.pending += 2
+    session.last_used = time.monotonic()
+    if session.pending >= settings.CHAT_SUMMARY_TRIGGER_TURNS:
+        chat_summary.schedule_fold(user_id)
+
+
+def invalidate(user_id: int) -> None:
+    _sessions.pop(user_id, None)
@@ -0,0 +1,88 @@
+"""Rolling summary of the psychologist chat: bounded context instead of the last 20 raw turns.
+
+The model sees the per-user summary (ptsd_chat_summaries) plus the most recent turns that
+fit CHAT_CONTEXT_TOKEN_BUDGET. Once enough turns pile up after the summary, a background
+task folds all but the last CHAT_SUMMARY_KEEP_TURNS into it.
+"""
+import asyncio
+import logging
+import math
+import re
+
+from config import settings
+from db import client as db
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+SUMMARY_HEADER = "[КРАТКОЕ СОДЕРЖАНИЕ ПРЕДЫДУЩИХ РАЗГОВОРОВ]"
+SUMMARY_ACK = "Понял, учитываю контекст предыдущих разговоров."
+
+_folding: set[int] = set()
+_tasks: set[asyncio.Task] = set()
+
+
+def estimate_tokens(text: str) -> int:
+    """Local token estimate: ~4 characters per sub-word piece, every punctuation mark is one."""
+    return sum(math.ceil(len(piece) / 4) for piece in _TOKEN_RE.findall(text))
+
+
+def fit_to_budget(turns: list[dict], budget: int) -> list[dict]:
+    """Newest turns whose total estimate fits the budget (always keeps the last one)."""
+    kept = []
+    for turn in reversed(turns):
+        budget -= estimate_tokens(turn["content"])
+        if budget < 0 and kept:
+            break
+        kept.append(turn)
+    return list(reversed(kept))
+
+
+async def load(user_id: int) -> tuple[list[dict], list[dict], int]:
+    """(summary turn pair or [], recent turns within the remaining budget, unsummarised turn count)."""
+    summary = await db.get_chat_summary(user_id)
+    after = summary["summarized_until"] if summary else None
+    turns = await db.get_chat_history(user_id, limit=settings.CHAT_HISTORY_LIMIT, after=after)
+
+    budget = settings.CHAT_CONTEXT_TOKEN_BUDGET
+    prefix = []
+    if summary and summary["summary"]:
+        summary_text = f"{SUMMARY_HEADER}\n{summary['summary']}"
+        budget -= estimate_tokens(summary_text)
+        prefix = [
+            {"role": "user", "content": summary_text},
+            {"role": "assistant", "content": SUMMARY_ACK},
+        ]
+    recent = fit_to_budget(turns, budget) if turns else []
+    return prefix, [{"role": t["role"], "content": t["content"]} for t in recent], len(turns)
+
+
+def schedule_fold(user_id: int) -> None:
+    if user_id in _folding:
+        return
+    _folding.add(user_id)
+    task = asyncio.create_task(_fold(user_id))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def _fold(user_id: int) -> None:
+    from services import openai_service
+
+    try:
+        summary = await db.get_chat_summary(user_id)
+        after = summary["summarized_until"] if summary else None
+        turns = await db.get_chat_messages_after(user_id, after, settings.CHAT_SUMMARY_FOLD_MAX)
+        older = turns[:-settings.CHAT_SUMMARY_KEEP_TURNS]
+        if not older:
+            return
+        new_summary = await openai_service.summarize_chat(summary["summary"] if summary else "", older)
+        await db.upsert_chat_summary(user_id, new_summary, older[-1]["created_at"])
+        from services import chat_sessions
+        chat_sessions.invalidate(user_id)  # next turn picks up the new summary
+        logger.info("Folded %d chat turns into summary for user %s", len(older), user_id)
+    except Exception as e:
+        logger.warning("Chat summary fold failed for user %s: %s", user_id, e)
+    finally:
+        _folding.discard(user_id)
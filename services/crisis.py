@@ -1,4 +1,17 @@
-"""Crisis keyword detection. Matches logic from AI_PSYCHOLOGIST_FLOW and WEEKLY_CHECK_ANALYSIS_FLOW."""
+"""Crisis keyword detection. Matches logic from AI_PSYCHOLOGIST_FLOW and WEEKLY_CHECK_ANALYSIS_FLOW.
+
+Text is normalised (lowercase, ё→е, punctuation dropped, words joined by single spaces and
+sentences by "\n") and scanned once by an Aho-Corasick automaton built at import from
+CRISIS_PATTERNS. A pattern matches whole words unless it ends in "*" (a stem: the last
+word may continue, so inflected forms match); "^" / "$" pin it to the start / end of a
+sentence. Every hit maps back to its CRISIS_KEYWORDS marker and its span in the original
+text.
+"""
+import re
+from bisect import bisect_right
+from collections import deque
+from dataclasses import dataclass
+
 from aiogram import Bot
 
 CRISIS_KEYWORDS = [
@@ -7,6 +20,29 @@ CRISIS_KEYWORDS = [
     'уйти из жизни', 'хочу умереть', 'лучше бы я умер',
 ]
 
+# marker → patterns (whole words; "*" — stem, "^"/"$" — sentence start/end). Everyday phrases
+# share words with these ("закончу все упражнения", "хочу умерить аппетит", "в общаге жить
+# не хочу"), so ambiguous ones are spelled out or need a context that settles them.
+CRISIS_PATTERNS = {
+    'суицид': ['суицид*'],
+    'самоубийств': ['самоубийств*'],
+    'убить себя': ['убить себя', 'убью себя', 'убил себя', 'убила себя', 'убиваю себя'],
+    'покончить': ['покончить', 'покончу с собой', 'покончил с собой', 'покончила с собой',
+                  'покончу с жизнью'],
+    'не хочу жить': ['не хочу жить', 'не хочется жить', 'не хотел жить', 'не хотела жить',
+                     'не хочу больше жить', '^жить не хочу$', '^жить не хочется$',
+                     'больше жить не хочу', 'вообще жить не хочу', 'просто жить не хочу',
+                     'уже жить не хочу', 'жить больше не хочу', 'жить больше не хочется'],
+    'смысла нет': ['смысла нет', 'нет смысла жить', 'смысла жить нет'],
+    'закончить всё': ['закончить все$', 'закончить все раз и навсегда', 'закончить с собой',
+                      'закончить с жизнью', 'закончу с собой', 'закончу с жизнью',
+                      'закончу все с собой', 'закончу все с жизнью'],
+    'уйти из жизни': ['уйти из жизн*', 'уйду из жизн*', 'ушел из жизн*', 'ушла из жизн*'],
+    'хочу умереть': ['хочу умереть', 'хочется умереть', 'хотел умереть', 'хотела умереть',
+                     'хочу уже умереть', 'хочу просто умереть'],
+    'лучше бы я умер': ['лучше бы я умер', 'лучше бы я умерла', 'лучше бы мне умереть'],
+}
+
 CRISIS_MESSAGE = (
     "🚨 *Боец, я вижу что тебе сейчас очень тяжело.*\n\n"
     "Пожалуйста, свяжись с кризисной службой прямо сейчас:\n\n"
@@ -16,10 +52,137 @@ CRISIS_MESSAGE = (
 )
 
 
+_WORD_RE = re.compile(r"[^\W_]+")
+_SENTENCE_RE = re.compile(r"[.!?…;\n]+")
+
+
+def normalize(text: str) -> str:
+    sentences = (" ".join(_WORD_RE.findall(s)) for s in _SENTENCE_RE.split(text.lower().replace("ё", "е")))
+    return "\n".join(s for s in sentences if s)
+
+
+@dataclass
+class CrisisMatch:
+    keyword: str
+    start: int
+    end: int  # offsets into the original text
+
+
+class _Automaton:
+    """Aho-Corasick automaton compiled to a DFA: one dict lookup per input character."""
+
+    def __init__(self, patterns: dict[str, str]):
+        goto: list[dict[str, int]] = [{}]
+        out: list[list[tuple[int, str, bool, bool, bool]]] = [[]]
+        for raw, keyword in patterns.items():
+            head, tail, stem = raw.startswith("^"), raw.endswith("$"), raw.endswith("*")
+            pattern = normalize(raw)
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = goto[state][ch] = len(goto)
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append((len(pattern), keyword, head, tail, stem))
+
+        fail = [0] * len(goto)
+        self.delta: list[dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            out[state] = out[state] + out[fail[state]]
+            # BFS order: the fail state's transitions are already complete
+            self.delta[state] = {**self.delta[fail[state]], **goto[state]}
+            for ch, nxt in goto[state].items():
+                fail[nxt] = self.delta[fail[state]].get(ch, 0)
+                queue.append(nxt)
+        self.out = out
+
+    def search(self, text: str) -> list[tuple[int, int, str]]:
+        """(start, end, keyword) in normalised `text` for matches on word boundaries.
+
+        "\n" ends a sentence and no pattern crosses it, so separately normalised texts can
+        be joined with it and scanned in one pass.
+        """
+        delta, out = self.delta, self.out
+        hits = []
+        state = 0
+        last = len(text) - 1
+        for i, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                for length, keyword, head, tail, stem in out[state]:
+                    start = i + 1 - length
+                    before = text[start - 1] if start else "\n"
+                    after = text[i + 1] if i < last else "\n"
+                    if before != "\n" and (head or before != " "):
+                        continue
+                    if not stem and after != "\n" and (tail or after != " "):
+                        continue
+                    hits.append((start, i + 1, keyword))
+        return hits
+
+
+_automaton = _Automaton({
+    pattern: keyword for keyword, patterns in CRISIS_PATTERNS.items() for pattern in patterns
+})
+
+
+def _original_spans(text: str, hits: list[tuple[int, int, str]]) -> list[CrisisMatch]:
+    """Map normalised offsets back to the original text (only runs when something matched).
+
+    Lowercasing may change length (e.g. "İ" → "i̇"), so each lowered character remembers
+    the index of the original character it came from.
+    """
+    lowered = []
+    origin = []
+    for i, ch in enumerate(text):
+        low = ch.lower()
+        lowered.append(low)
+        origin.extend([i] * len(low))
+    words = list(_WORD_RE.finditer("".join(lowered)))
+    norm_starts = []
+    pos = 0
+    for m in words:
+        norm_starts.append(pos)
+        pos += len(m.group()) + 1
+    matches = []
+    for start, end, keyword in hits:
+        first = bisect_right(norm_starts, start) - 1
+        last = bisect_right(norm_starts, end - 1) - 1
+        # the last pattern word may be a stem: the span runs to the end of the text word
+        matches.append(CrisisMatch(keyword, origin[words[first].start()], origin[words[last].end() - 1] + 1))
+    return matches
+
+
+def find_crisis(text: str) -> list[CrisisMatch]:
+    """All crisis marker occurrences with their spans in `text`."""
+    hits = _automaton.search(normalize(text))
+    return _original_spans(text, hits) if hits else []
+
+
 def detect_crisis(text: str) -> list[str]:
     """Returns list of detected crisis keywords, empty if none."""
-    text_lower = text.lower()
-    return [kw for kw in CRISIS_KEYWORDS if kw in text_lower]
+    found = {keyword for _, _, keyword in _automaton.search(normalize(text))}
+    return [kw for kw in CRISIS_KEYWORDS if kw in found]
+
+
+def detect_crisis_batch(texts: list[str]) -> list[list[str]]:
+    """detect_crisis for many texts at once: one automaton pass over the joined batch."""
+    starts = []
+    pos = 0
+    normalised = []
+    for text in texts:
+        norm = normalize(text or "")
+        starts.append(pos)
+        normalised.append(norm)
+        pos += len(norm) + 1
+    found: list[set[str]] = [set() for _ in texts]
+    for start, _, keyword in _automaton.search("\n".join(normalised)):
+        found[bisect_right(starts, start) - 1].add(keyword)
+    return [[kw for kw in CRISIS_KEYWORDS if kw in f] if f else [] for f in found]
 
 
 async def handle_crisis(bot: Bot, user_id: int, chat_id: int) -> None:
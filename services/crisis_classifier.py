@@ -0,0 +1,145 @@
+"""Local crisis / sentiment pre-screen: hashed character n-grams + two linear models.
+
+Text is normalised like services/crisis.py; every word, padded with spaces, contributes its
+character 2–4-grams and the word itself, hashed (crc32, stable across processes) into
+`dim` buckets and L2-normalised. A logistic model gives the crisis probability, a linear
+one the sentiment on the weekly-check scale −5..5. Weights are sparse dicts, so scoring is
+one dict lookup per feature — tens of microseconds, no network.
+
+The model is trained offline by scripts/train_crisis_classifier.py and bundled as JSON
+(CRISIS_CLASSIFIER_PATH). It catches paraphrases that the keyword automaton misses; it
+does not replace it or the Gemini analysis: a flag is logged and counted, but never sets
+crisis_hold or suicide_flag by itself.
+"""
+import json
+import logging
+import math
+import os
+import zlib
+from dataclasses import dataclass
+from functools import lru_cache
+
+from config import settings
+from services import metrics
+from services.crisis import normalize
+
+logger = logging.getLogger(__name__)
+
+NGRAM_MIN, NGRAM_MAX = 2, 4
+
+
+@lru_cache(maxsize=50_000)
+def _word_features(word: str, dim: int) -> tuple[int, ...]:
+    padded = f" {word} "
+    grams = [padded[i:i + n] for n in range(NGRAM_MIN, NGRAM_MAX + 1) for i in range(len(padded) - n + 1)]
+    grams.append("w:" + word)
+    mask = dim - 1
+    return tuple(zlib.crc32(g.encode()) & mask for g in grams)
+
+
+def features(text: str, dim: int) -> dict[int, float]:
+    """Sparse L2-normalised feature vector; `dim` must be a power of two."""
+    counts: dict[int, float] = {}
+    for word in normalize(text).split():
+        for idx in _word_features(word, dim):
+            counts[idx] = counts.get(idx, 0.0) + 1.0
+    if counts:
+        norm = math.sqrt(sum(v * v for v in counts.values()))
+        for idx in counts:
+            counts[idx] /= norm
+    return counts
+
+
+@dataclass
+class Linear:
+    bias: float
+    weights: dict[int, float]
+
+    def __call__(self, x: dict[int, float]) -> float:
+        w = self.weights
+        return self.bias + sum(v * w.get(i, 0.0) for i, v in x.items())
+
+    def to_json(self) -> dict:
+        return {"bias": round(self.bias, 6),
+                "weights": {str(i): round(v, 6) for i, v in self.weights.items() if abs(v) >= 1e-5}}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Linear":
+        return cls(data["bias"], {int(i): v for i, v in data["weights"].items()})
+
+
+@dataclass
+class Prescreen:
+    crisis_probability: float
+    sentiment: float  # −5..5
+
+    @property
+    def flagged(self) -> bool:
+        return self.crisis_probability >= settings.CRISIS_CLASSIFIER_THRESHOLD
+
+
+def sigmoid(z: float) -> float:
+    if z < -30:
+        return 0.0
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+class CrisisClassifier:
+    def __init__(self, dim: int, crisis: Linear, sentiment: Linear, meta: dict | None = None):
+        self.dim = dim
+        self.crisis = crisis
+        self.sentiment = sentiment
+        self.meta = meta or {}
+
+    def score(self, text: str) -> Prescreen:
+        x = features(text, self.dim)
+        sentiment = max(-5.0, min(5.0, self.sentiment(x)))
+        return Prescreen(sigmoid(self.crisis(x)), sentiment)
+
+    def to_json(self) -> dict:
+        return {"dim": self.dim, "ngrams": [NGRAM_MIN, NGRAM_MAX],
+                "crisis": self.crisis.to_json(), "sentiment": self.sentiment.to_json(), **self.meta}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "CrisisClassifier":
+        if data.get("ngrams", [NGRAM_MIN, NGRAM_MAX]) != [NGRAM_MIN, NGRAM_MAX]:
+            raise ValueError("model was trained with a different n-gram range")
+        meta = {k: v for k, v in data.items() if k not in ("dim", "ngrams", "crisis", "sentiment")}
+        return cls(data["dim"], Linear.from_json(data["crisis"]), Linear.from_json(data["sentiment"]), meta)
+
+    @classmethod
+    def load(cls, path: str) -> "CrisisClassifier":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_json(json.load(f))
+
+
+_model: CrisisClassifier | None = None
+_load_failed = False
+
+
+def get_model() -> CrisisClassifier | None:
+    """The bundled model, loaded once; None (pre-screen off) if missing or unreadable."""
+    global _model, _load_failed
+    if _model is None and not _load_failed and settings.CRISIS_CLASSIFIER_PATH:
+        path = settings.CRISIS_CLASSIFIER_PATH
+        if not os.path.isabs(path):
+            path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), path)
+        try:
+            _model = CrisisClassifier.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Crisis classifier not loaded (%s): pre-screen disabled", e)
+            _load_failed = True
+    return _model
+
+
+def prescreen(text: str, source: str) -> Prescreen | None:
+    """Local score for `text`, None when no model is available."""
+    model = get_model()
+    if model is None:
+        return None
+    result = model.score(text)
+    metrics.observe("crisis_prescreen_probability", result.crisis_probability, source=source)
+    if result.flagged:
+        metrics.inc("crisis_prescreen_flagged", source=source)
+        logger.info("crisis_prescreen flagged source=%s p=%.2f", source, result.crisis_probability)
+    return result
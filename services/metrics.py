@@ -0,0 +1,72 @@
+"""In-process counters and summaries, rendered in Prometheus text format at /metrics.
+
+In sharded mode (workers.py) every worker process pushes snapshot() to the ingress, whose
+/metrics renders them next to its own series with a worker="N" label.
+"""
+from collections import defaultdict
+
+_counters: dict[tuple[str, tuple], float] = defaultdict(float)
+_gauges: dict[tuple[str, tuple], float] = {}
+# (count, sum, max)
+_summaries: dict[tuple[str, tuple], list[float]] = {}
+
+
+def _key(name: str, labels: dict) -> tuple[str, tuple]:
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    _counters[_key(name, labels)] += value
+
+
+def set_gauge(name: str, value: float, **labels) -> None:
+    _gauges[_key(name, labels)] = value
+
+
+def observe(name: str, value: float, **labels) -> None:
+    key = _key(name, labels)
+    s = _summaries.get(key)
+    if s is None:
+        _summaries[key] = [1, value, value]
+    else:
+        s[0] += 1
+        s[1] += value
+        if value > s[2]:
+            s[2] = value
+
+
+def _fmt(name: str, labels: tuple) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+def snapshot() -> tuple[dict, dict, dict]:
+    """Picklable copy of this process's series."""
+    return dict(_counters), dict(_gauges), {k: list(v) for k, v in _summaries.items()}
+
+
+def _render(snap: tuple[dict, dict, dict], extra: tuple = ()) -> list[str]:
+    counters, gauges, summaries = snap
+
+    def labelled(labels: tuple) -> tuple:
+        return tuple(sorted(labels + extra)) if extra else labels
+
+    lines = []
+    for (name, labels), value in sorted(counters.items()):
+        lines.append(f"{_fmt(name + '_total', labelled(labels))} {value:g}")
+    for (name, labels), value in sorted(gauges.items()):
+        lines.append(f"{_fmt(name, labelled(labels))} {value:g}")
+    for (name, labels), (count, total, peak) in sorted(summaries.items()):
+        labels = labelled(labels)
+        lines.append(f"{_fmt(name + '_count', labels)} {count:g}")
+        lines.append(f"{_fmt(name + '_sum', labels)} {total:g}")
+        lines.append(f"{_fmt(name + '_max', labels)} {peak:g}")
+    return lines
+
+
+def render(workers: dict[int, tuple[dict, dict, dict]] | None = None) -> str:
+    lines = _render(snapshot())
+    for index, snap in sorted((workers or {}).items()):
+        lines.extend(_render(snap, (("worker", str(index)),)))
+    return "\n".join(lines) + "\n"
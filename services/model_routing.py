@@ -0,0 +1,71 @@
+"""Per-request model tier and output budget for Gemini text calls.
+
+MODEL_ROUTES (config) gives each op a default tier and max_tokens, an optional cheaper
+choice for short inputs and an optional faster tier used while the default model's
+recent p95 latency is over the op's budget. MODEL_ROUTE_OVERRIDES pins an op to a tier.
+Every decision is logged and counted so latency and token budgets can be compared
+against the single-model baseline.
+"""
+import logging
+from dataclasses import dataclass
+
+from config import settings
+from services import metrics
+from services.providers import ProviderHealth
+
+logger = logging.getLogger(__name__)
+
+_latency: dict[str, ProviderHealth] = {}
+
+
+@dataclass
+class Route:
+    op: str
+    tier: str
+    model: str
+    max_tokens: int | None
+    reason: str
+
+
+def _health(model: str) -> ProviderHealth:
+    health = _latency.get(model)
+    if health is None:
+        health = _latency[model] = ProviderHealth(model)
+    return health
+
+
+def choose(op: str, input_chars: int) -> Route:
+    rule = settings.MODEL_ROUTES.get(op, {})
+    tier = rule.get("tier", "standard")
+    max_tokens = rule.get("max_tokens")
+    reason = "default"
+
+    if "short_chars" in rule and input_chars <= rule["short_chars"]:
+        tier = rule.get("short_tier", tier)
+        max_tokens = rule.get("short_max_tokens", max_tokens)
+        reason = "short_input"
+
+    budget = rule.get("latency_budget")
+    if budget and "slow_tier" in rule:
+        p95 = _health(settings.MODEL_TIERS[tier]).percentile(0.95)
+        if p95 is not None and p95 > budget:
+            tier = rule["slow_tier"]
+            reason = "latency"
+
+    if op in settings.MODEL_ROUTE_OVERRIDES:
+        tier = settings.MODEL_ROUTE_OVERRIDES[op]
+        reason = "override"
+
+    route = Route(op, tier, settings.MODEL_TIERS[tier], max_tokens, reason)
+    logger.info("model_route op=%s tier=%s model=%s max_tokens=%s input_chars=%d reason=%s",
+                op, tier, route.model, max_tokens, input_chars, reason)
+    metrics.inc("ai_route", op=op, tier=tier, reason=reason)
+    if max_tokens:
+        metrics.observe("ai_route_max_tokens", max_tokens, op=op, tier=tier)
+    return route
+
+
+def observe(route: Route, seconds: float) -> None:
+    """Record the latency of a finished call against the model it was routed to."""
+    _health(route.model).record_latency(seconds)
+    metrics.observe("ai_model_latency_seconds", seconds, op=route.op, model=route.model)
@@ -0,0 +1,159 @@
+"""Minimal Ogg container reader/writer for splitting Opus voice notes.
+
+Telegram voice notes are Ogg/Opus. Splitting happens at page boundaries by granule
+position (48 kHz samples), so no audio is decoded: every chunk is the two Opus header
+packets plus a run of the original audio pages, renumbered, with granules rebased to
+start at zero and the CRC recomputed. Consecutive chunks overlap by whole pages.
+"""
+import struct
+from dataclasses import dataclass
+
+SAMPLE_RATE = 48000
+_HEADER = struct.Struct("<4sBBqIIIB")  # capture, version, type, granule, serial, seq, crc, segments
+
+CONTINUED, BOS, EOS = 0x01, 0x02, 0x04
+
+
+def _crc_table() -> list[int]:
+    table = []
+    for i in range(256):
+        r = i << 24
+        for _ in range(8):
+            r = ((r << 1) ^ 0x04C11DB7) if r & 0x80000000 else (r << 1)
+        table.append(r & 0xFFFFFFFF)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def crc32(data: bytes) -> int:
+    """Ogg CRC: polynomial 0x04C11DB7, MSB-first, zero init, no final xor."""
+    crc = 0
+    table = _CRC_TABLE
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ table[(crc >> 24) ^ byte]
+    return crc
+
+
+@dataclass
+class Page:
+    header_type: int
+    granule: int
+    serial: int
+    seq: int
+    lacing: bytes
+    data: memoryview
+
+    @property
+    def packets_completed(self) -> int:
+        return sum(1 for v in self.lacing if v < 255)
+
+
+def parse_pages(buf: bytes | memoryview) -> list[Page]:
+    view = memoryview(buf)
+    pages = []
+    pos = 0
+    while pos < len(view):
+        if len(view) - pos < _HEADER.size:
+            raise ValueError("truncated Ogg page header")
+        capture, version, header_type, granule, serial, seq, _crc, nseg = _HEADER.unpack_from(view, pos)
+        if capture != b"OggS" or version != 0:
+            raise ValueError(f"not an Ogg page at offset {pos}")
+        lacing = bytes(view[pos + _HEADER.size:pos + _HEADER.size + nseg])
+        start = pos + _HEADER.size + nseg
+        end = start + sum(lacing)
+        if end > len(view):
+            raise ValueError("truncated Ogg page body")
+        pages.append(Page(header_type, granule, serial, seq, lacing, view[start:end]))
+        pos = end
+    return pages
+
+
+def write_page(page: Page) -> bytes:
+    header = _HEADER.pack(b"OggS", 0, page.header_type, page.granule, page.serial, page.seq, 0,
+                          len(page.lacing))
+    raw = b"".join((header, page.lacing, page.data))
+    crc = crc32(raw)
+    return raw[:22] + struct.pack("<I", crc) + raw[26:]
+
+
+def _opus_headers(pages: list[Page]) -> tuple[int, int]:
+    """(number of header pages, pre-skip) for an Ogg/Opus stream."""
+    if not pages or bytes(pages[0].data[:8]) != b"OpusHead":
+        raise ValueError("not an Ogg/Opus stream")
+    pre_skip = struct.unpack_from("<H", pages[0].data, 10)[0]
+    packets = 0
+    for i, page in enumerate(pages):
+        packets += page.packets_completed
+        if packets >= 2:  # OpusHead + OpusTags
+            return i + 1, pre_skip
+    raise ValueError("missing OpusTags header")
+
+
+def duration(buf: bytes | memoryview) -> float:
+    pages = parse_pages(buf)
+    _, pre_skip = _opus_headers(pages)
+    last = max((p.granule for p in pages if p.granule >= 0), default=0)
+    return max(0, last - pre_skip) / SAMPLE_RATE
+
+
+def split_opus(buf: bytes | memoryview, chunk_seconds: float,
+               overlap_seconds: float) -> list[bytes | memoryview]:
+    """Overlapping, independently decodable chunks of an Ogg/Opus stream. Raises ValueError.
+
+    A stream short enough for one chunk is returned as is (the same object, not a copy).
+    """
+    pages = parse_pages(buf)
+    n_headers, pre_skip = _opus_headers(pages)
+    headers, audio = pages[:n_headers], pages[n_headers:]
+    if not audio:
+        return [buf]
+
+    # start time (seconds) of each audio page = end granule of the previous one
+    starts = []
+    granule = pre_skip
+    for page in audio:
+        starts.append((granule - pre_skip) / SAMPLE_RATE)
+        if page.granule >= 0:
+            granule = page.granule
+    total = (granule - pre_skip) / SAMPLE_RATE
+    if total <= chunk_seconds:
+        return [buf]
+
+    step = max(chunk_seconds - overlap_seconds, 1.0)
+    chunks = []
+    t = 0.0
+    while t < total:
+        first = next(i for i, s in enumerate(starts) if s >= t or i == len(starts) - 1)
+        while first > 0 and audio[first].header_type & CONTINUED:
+            first -= 1  # never start on the tail of a packet
+        last = first
+        while last + 1 < len(audio) and starts[last + 1] < t + chunk_seconds:
+            last += 1
+        chunks.append(_assemble(headers, audio, first, last, pre_skip))
+        if last == len(audio) - 1:
+            break
+        t += step
+    return chunks
+
+
+def _assemble(headers: list[Page], audio: list[Page], first: int, last: int, pre_skip: int) -> bytes:
+    base = pre_skip
+    for page in reversed(audio[:first]):
+        if page.granule >= 0:
+            base = page.granule
+            break
+    out = [write_page(p) for p in headers]
+    seq = len(headers)
+    for i in range(first, last + 1):
+        page = audio[i]
+        header_type = page.header_type & ~(BOS | EOS)
+        if i == first:
+            header_type &= ~CONTINUED
+        if i == last:
+            header_type |= EOS
+        granule = page.granule - base + pre_skip if page.granule >= 0 else -1
+        out.append(write_page(Page(header_type, granule, page.serial, seq, page.lacing, page.data)))
+        seq += 1
+    return b"".join(out)
@@ -1,19 +1,34 @@
-"""Gemini AI: voice transcription and text analysis/chat (google-genai SDK)."""
+"""Gemini AI: voice transcription and text analysis/chat (google-genai SDK).
+
+Text calls go through providers: Gemini first, with a hedged duplicate to OpenRouter
+when Gemini is slower than its own recent AI_HEDGE_PERCENTILE latency. The Gemini model
+tier and output budget are picked per request by services/model_routing.py.
+"""
 import asyncio
 import json
+import time
 
 from google import genai
 from google.genai import types
 
 from config import settings
+from services import ai_usage, metrics, model_routing
+from services.admission import ai as admission
+from services.cassette import RecordingProvider, ReplayProvider
+from services.providers import GeminiProvider, OpenRouterProvider
 
 _client: genai.Client | None = None
 
 
 def get_client() -> genai.Client:
+    """Shared client — all calls go through client.aio over one HTTP connection pool."""
     global _client
     if _client is None:
-        _client = genai.Client(api_key=settings.GEMINI_API_KEY)
+        _client = genai.Client(
+            api_key=settings.GEMINI_API_KEY,
+            # Transport-level backstop; per-call deadlines are enforced with asyncio.timeout
+            http_options=types.HttpOptions(timeout=int(settings.AI_TRANSCRIBE_TIMEOUT * 1000)),
+        )
     return _client
 
 
@@ -81,90 +96,281 @@ WEEKLY_CHECK_SYSTEM_PROMPT = """Проанализируй ответ участ
   "crisis_detected": <true/false>
 }"""
 
-
-async def transcribe(file_bytes: bytes, filename: str = "voice.ogg") -> str:
+WEEKLY_CHECK_BATCH_SYSTEM_PROMPT = """Проанализируй ответы нескольких участников реабилитационной программы на еженедельный вопрос о самочувствии.
+Каждый ответ анализируй независимо от остальных.
+На вход — JSON-массив [{"id": <число>, "text": "<ответ>"}].
+Верни JSON:
+{
+  "results": [
+    {"id": <тот же id>, "ai_analysis": "краткий анализ 1-2 предложения", "sentiment_score": <число от -5 до 5>, "crisis_detected": <true/false>}
+  ]
+}
+Ровно один элемент results на каждый входной id."""
+
+CHAT_SUMMARY_SYSTEM_PROMPT = """Ты ведёшь рабочие заметки военного психолога о переписке с участником программы реабилитации.
+Тебе дают прежние заметки (могут отсутствовать) и новые сообщения диалога.
+Верни обновлённые заметки одним текстом до 200 слов, без вступлений:
+- ключевые темы, симптомы и триггеры, о которых рассказал участник;
+- какие техники уже предлагались и как он на них отреагировал;
+- важные факты о его жизни и состоянии, договорённости;
+- любые упоминания кризисных мыслей — сохраняй обязательно.
+Не выдумывай того, чего нет в сообщениях."""
+
+
+_gemini = GeminiProvider(MODEL)
+_primary = _gemini
+_secondary = (
+    OpenRouterProvider(settings.OPENROUTER_API_KEY, settings.OPENROUTER_MODEL)
+    if settings.OPENROUTER_API_KEY else None
+)
+if settings.AI_CASSETTE_MODE == "record":
+    _primary, _secondary = RecordingProvider(_gemini, settings.AI_CASSETTE_PATH), None
+elif settings.AI_CASSETTE_MODE == "replay":
+    _primary = ReplayProvider.from_file(settings.AI_CASSETTE_PATH, settings.AI_CASSETTE_LATENCY_SCALE)
+    _secondary = None
+
+
+def set_providers(primary, secondary=None) -> None:
+    """Swap providers (e.g. StubProvider for offline tests and benchmarks)."""
+    global _primary, _secondary
+    _primary, _secondary = primary, secondary
+
+
+async def _attempt(provider, call, parse, rec: ai_usage.CallRecord):
+    start = time.monotonic()
+    rec.attempts += 1
+    try:
+        completion = await call(provider)
+    except asyncio.CancelledError:
+        # Lost the race — still a (lower-bound) latency sample for the percentile
+        provider.health.record_latency(time.monotonic() - start)
+        raise
+    except Exception:
+        provider.health.record_failure()
+        raise
+    try:
+        result = parse(completion.text)
+    except Exception:
+        rec.parse_failures += 1
+        provider.health.record_failure()
+        raise
+    provider.health.record_success(time.monotonic() - start)
+    rec.provider, rec.model, rec.usage = provider.name, completion.model, completion.usage
+    return result
+
+
+async def _hedged(op: str, call, parse, rec: ai_usage.CallRecord):
+    """Run call(provider) on the primary; if it is slower than its latency percentile,
+    race a duplicate on the secondary. First good (parsed) answer wins, the loser is cancelled."""
+    candidates = [p for p in (_primary, _secondary) if p is not None and p.health.available()]
+    if not candidates:
+        candidates = [_primary]
+
+    first = asyncio.create_task(_attempt(candidates[0], call, parse, rec))
+    if len(candidates) == 1:
+        return await first
+
+    delay = candidates[0].health.percentile(settings.AI_HEDGE_PERCENTILE) or settings.AI_HEDGE_DEFAULT_DELAY
+    tasks = {first: candidates[0]}
+    try:
+        done, pending = await asyncio.wait({first}, timeout=delay)
+        if first in done and first.exception() is None:
+            return first.result()
+
+        metrics.inc("ai_hedge_fired", op=op)
+        second = asyncio.create_task(_attempt(candidates[1], call, parse, rec))
+        tasks[second] = candidates[1]
+        pending = {t for t in tasks if not t.done()}
+        errors = []
+        while True:
+            for task in done:
+                if task.exception() is None:
+                    metrics.inc("ai_hedge_winner", op=op, provider=tasks[task].name)
+                    return task.result()
+                errors.append(task.exception())
+            if not pending:
+                raise errors[0]
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def _generate(op: str, system: str, messages: list[dict], parse,
+                    input_chars: int | None = None, route: model_routing.Route | None = None, **kwargs):
+    if route is None:
+        if input_chars is None:
+            input_chars = len(messages[-1]["content"])
+        route = model_routing.choose(op, input_chars)
+    kwargs.update(model=route.model, max_tokens=route.max_tokens)
+
+    rec = ai_usage.CallRecord(op, model=route.model)
+    start = time.monotonic()
+    try:
+        async with asyncio.timeout(settings.AI_CALL_TIMEOUT):
+            result = await _hedged(op, lambda p: p.generate(op, system, messages, **kwargs), parse, rec)
+        rec.ok = True
+    finally:
+        rec.latency = time.monotonic() - start
+        ai_usage.record(rec)
+    model_routing.observe(route, rec.latency)
+    return result
+
+
+def _text(raw: str) -> str:
+    if not raw or not raw.strip():
+        raise ValueError("empty model response")
+    return raw
+
+
+async def transcribe(file_bytes: bytes | memoryview, filename: str = "voice.ogg") -> str:
     """Transcribe voice message via Gemini inline audio."""
-    def _do():
-        client = get_client()
-        response = client.models.generate_content(
-            model=AUDIO_MODEL,
-            contents=[
-                types.Part.from_bytes(data=file_bytes, mime_type="audio/ogg"),
-                "Транскрибируй это аудио на русском языке. Верни только текст, без пояснений.",
-            ],
-        )
-        return response.text.strip()
-
-    return await asyncio.to_thread(_do)
-
-
-async def analyze_questionnaire(answers: list[dict], user_name: str) -> dict:
-    """Run Gemini analysis on 32 questionnaire answers. Returns parsed dict."""
+    async with admission.admit("transcription"):
+        rec = ai_usage.CallRecord("transcription", model=AUDIO_MODEL, provider="gemini", attempts=1)
+        start = time.monotonic()
+        try:
+            async with asyncio.timeout(settings.AI_TRANSCRIBE_TIMEOUT):
+                response = await get_client().aio.models.generate_content(
+                    model=AUDIO_MODEL,
+                    contents=[
+                        # The SDK wants bytes: the only copy of a downloaded view (none for bytes)
+                        types.Part.from_bytes(data=bytes(file_bytes), mime_type="audio/ogg"),
+                        "Транскрибируй это аудио на русском языке. Верни только текст, без пояснений.",
+                    ],
+                )
+            rec.usage = ai_usage.gemini_usage(response)
+            rec.ok = True
+        finally:
+            rec.latency = time.monotonic() - start
+            ai_usage.record(rec)
+    return response.text.strip()
+
+
+def questionnaire_prompt(answers: list[dict], user_name: str) -> str:
     answers_text = "\n".join(
         f"{a['question_number']}. {a.get('question_text', '')} — {a['answer_text']}"
         for a in answers
     )
-    prompt = f"Участник: {user_name}\n\nОтветы на анкету:\n{answers_text}"
-
-    def _do():
-        client = get_client()
-        response = client.models.generate_content(
-            model=MODEL,
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                system_instruction=QUESTIONNAIRE_SYSTEM_PROMPT,
-                response_mime_type="application/json",
-                temperature=0.3,
-            ),
-        )
-        return json.loads(response.text)
+    return f"Участник: {user_name}\n\nОтветы на анкету:\n{answers_text}"
 
-    return await asyncio.to_thread(_do)
+
+async def analyze_questionnaire(answers: list[dict], user_name: str,
+                                route: model_routing.Route | None = None) -> dict:
+    """Run AI analysis on 32 questionnaire answers. Returns parsed dict.
+
+    route: a model route already chosen by the caller (the questionnaire cache keys on it).
+    """
+    prompt = questionnaire_prompt(answers, user_name)
+
+    async with admission.admit("questionnaire", timeout=settings.AI_QUEUE_TIMEOUT_BACKGROUND):
+        return await _generate(
+            "questionnaire", QUESTIONNAIRE_SYSTEM_PROMPT, [{"role": "user", "content": prompt}],
+            json.loads, route=route, json_mode=True, temperature=0.3,
+        )
 
 
 async def chat_with_psychologist(history: list[dict], user_message: str,
                                   first_name: str = "боец") -> str:
     """Continue conversation with AI psychologist."""
-    system_prompt = PSYCHOLOGIST_SYSTEM_PROMPT_TEMPLATE.format(first_name=first_name)
-
-    def _do():
-        client = get_client()
-        gemini_history = []
-        for msg in history:
-            role = "user" if msg["role"] == "user" else "model"
-            gemini_history.append(types.Content(
-                role=role,
-                parts=[types.Part.from_text(text=msg["content"])],
-            ))
-
-        chat = client.chats.create(
-            model=MODEL,
-            config=types.GenerateContentConfig(
-                system_instruction=system_prompt,
-                temperature=0.7,
-                max_output_tokens=4500,
-            ),
-            history=gemini_history,
+    async with admission.admit("chat"):
+        return await _generate(
+            "chat", PSYCHOLOGIST_SYSTEM_PROMPT_TEMPLATE.format(first_name=first_name),
+            [*history, {"role": "user", "content": user_message}],
+            _text, input_chars=len(user_message), temperature=0.7,
         )
-        response = chat.send_message(user_message)
-        return response.text
 
-    return await asyncio.to_thread(_do)
+
+async def chat_with_psychologist_stream(history: list[dict], user_message: str,
+                                         first_name: str = "боец"):
+    """Same as chat_with_psychologist, but yields text chunks as the model produces them.
+
+    Streams from Gemini only (no hedging). AI_CALL_TIMEOUT bounds the wait for each next
+    chunk rather than the whole stream, so time the consumer spends editing Telegram
+    messages is not counted. With stub, recording or replay providers in place the whole
+    answer comes as one chunk from chat_with_psychologist.
+    """
+    if _primary is not _gemini:
+        yield await chat_with_psychologist(history, user_message, first_name)
+        return
+
+    route = model_routing.choose("chat", len(user_message))
+    async with admission.admit("chat"):
+        rec = ai_usage.CallRecord("chat", model=route.model, provider="gemini", attempts=1)
+        start = time.monotonic()
+        try:
+            async with asyncio.timeout(settings.AI_CALL_TIMEOUT):
+                stream = await _gemini.stream(
+                    "chat", PSYCHOLOGIST_SYSTEM_PROMPT_TEMPLATE.format(first_name=first_name),
+                    [*history, {"role": "user", "content": user_message}],
+                    temperature=0.7, max_tokens=route.max_tokens, model=route.model,
+                )
+            chunks = aiter(stream)
+            chunk = None
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(anext(chunks), settings.AI_CALL_TIMEOUT)
+                except StopAsyncIteration:
+                    break
+                if rec.ttft is None:
+                    rec.ttft = time.monotonic() - start
+                if chunk.text:
+                    yield chunk.text
+            # Usage metadata is complete on the last chunk
+            rec.usage = ai_usage.gemini_usage(chunk) if chunk is not None else None
+            rec.ok = True
+        finally:
+            rec.latency = time.monotonic() - start
+            ai_usage.record(rec)
+        model_routing.observe(route, rec.latency)
 
 
 async def analyze_weekly_check(response_text: str) -> dict:
     """Analyze weekly check response. Returns {ai_analysis, sentiment_score, crisis_detected}."""
-    def _do():
-        client = get_client()
-        response = client.models.generate_content(
-            model=MODEL,
-            contents=response_text,
-            config=types.GenerateContentConfig(
-                system_instruction=WEEKLY_CHECK_SYSTEM_PROMPT,
-                response_mime_type="application/json",
-                temperature=0.3,
-            ),
+    async with admission.admit("weekly_check"):
+        return await _generate(
+            "weekly_check", WEEKLY_CHECK_SYSTEM_PROMPT, [{"role": "user", "content": response_text}],
+            json.loads, json_mode=True, temperature=0.3,
         )
-        return json.loads(response.text)
 
-    return await asyncio.to_thread(_do)
+
+def _parse_weekly_batch(count: int):
+    def parse(raw: str) -> list[dict]:
+        by_id = {item["id"]: item for item in json.loads(raw)["results"]}
+        results = []
+        for i in range(count):
+            item = by_id[i]
+            results.append({
+                "ai_analysis": str(item["ai_analysis"]),
+                "sentiment_score": int(item["sentiment_score"]),
+                "crisis_detected": bool(item["crisis_detected"]),
+            })
+        return results
+
+    return parse
+
+
+async def analyze_weekly_checks_batch(response_texts: list[str]) -> list[dict]:
+    """Analyze several weekly check responses in one call. Raises ValueError/KeyError on bad output."""
+    payload = json.dumps([{"id": i, "text": t} for i, t in enumerate(response_texts)], ensure_ascii=False)
+
+    async with admission.admit("weekly_check_batch", timeout=settings.AI_QUEUE_TIMEOUT_BACKGROUND):
+        return await _generate(
+            "weekly_check_batch", WEEKLY_CHECK_BATCH_SYSTEM_PROMPT, [{"role": "user", "content": payload}],
+            _parse_weekly_batch(len(response_texts)), json_mode=True, temperature=0.3,
+        )
+
+
+async def summarize_chat(previous_summary: str, turns: list[dict]) -> str:
+    """Fold older chat turns into the running per-user summary."""
+    dialog = "\n".join(
+        f"{'Участник' if t['role'] == 'user' else 'Психолог'}: {t['content']}" for t in turns
+    )
+    prompt = f"Прежние заметки:\n{previous_summary or '—'}\n\nНовые сообщения:\n{dialog}"
+
+    async with admission.admit("chat_summary", timeout=settings.AI_QUEUE_TIMEOUT_BACKGROUND):
+        summary = await _generate(
+            "chat_summary", CHAT_SUMMARY_SYSTEM_PROMPT, [{"role": "user", "content": prompt}],
+            _text, temperature=0.2,
+        )
+    return summary.strip()
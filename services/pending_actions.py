@@ -0,0 +1,97 @@
+"""Pending multi-step actions (e.g. manager typing a rejection reason), TTL-bound.
+
+Backends:
+  memory   — process-local dict, default
+  supabase — shared ptsd_pending_actions table (kind, actor_id, payload jsonb, expires_at;
+             unique on kind+actor_id), survives restarts and works across instances
+
+contains() is synchronous and is the only call on the per-update fast path: a single
+lookup of the expiry of entries this process knows to be live. Shared backends
+learn about entries created elsewhere via refresh(), which the router calls only for
+messages from the manager group chat.
+"""
+import time
+
+from config import settings
+
+
+class MemoryPendingStore:
+    def __init__(self, kind: str, ttl: int):
+        self.kind = kind
+        self.ttl = ttl
+        self._entries: dict[int, tuple[float, list]] = {}
+
+    def contains(self, actor_id: int) -> bool:
+        entry = self._entries.get(actor_id)
+        if entry is None:
+            return False
+        if entry[0] < time.monotonic():
+            del self._entries[actor_id]
+            return False
+        return True
+
+    async def refresh(self, actor_id: int) -> None:
+        return None
+
+    async def put(self, actor_id: int, payload: list) -> None:
+        self._entries[actor_id] = (time.monotonic() + self.ttl, payload)
+
+    async def pop(self, actor_id: int) -> list | None:
+        if not self.contains(actor_id):
+            return None
+        return self._entries.pop(actor_id)[1]
+
+
+class SupabasePendingStore:
+    def __init__(self, kind: str, ttl: int):
+        self.kind = kind
+        self.ttl = ttl
+        # actor_id → local expiry of an entry this process knows to be live
+        self._known: dict[int, float] = {}
+
+    def contains(self, actor_id: int) -> bool:
+        expires = self._known.get(actor_id)
+        if expires is None:
+            return False
+        if expires < time.monotonic():
+            del self._known[actor_id]
+            return False
+        return True
+
+    async def refresh(self, actor_id: int) -> None:
+        from db import client as db
+
+        remaining = await db.get_pending_action_ttl(self.kind, actor_id)
+        if remaining is not None:
+            self._known[actor_id] = time.monotonic() + remaining
+        else:
+            self._known.pop(actor_id, None)
+
+    async def put(self, actor_id: int, payload: list) -> None:
+        from db import client as db
+
+        await db.put_pending_action(self.kind, actor_id, payload, self.ttl)
+        self._known[actor_id] = time.monotonic() + self.ttl
+
+    async def pop(self, actor_id: int) -> list | None:
+        from db import client as db
+
+        self._known.pop(actor_id, None)
+        return await db.pop_pending_action(self.kind, actor_id)
+
+
+_BACKENDS = {
+    "memory": MemoryPendingStore,
+    "supabase": SupabasePendingStore,
+}
+
+_stores: dict[str, MemoryPendingStore | SupabasePendingStore] = {}
+
+
+def get_store(kind: str) -> MemoryPendingStore | SupabasePendingStore:
+    store = _stores.get(kind)
+    if store is None:
+        backend = _BACKENDS[settings.PENDING_STORE_BACKEND]
+        store = _stores[kind] = backend(kind, settings.PENDING_ACTION_TTL_SECONDS)
+    return store
+
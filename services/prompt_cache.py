@@ -0,0 +1,113 @@
+"""Server-side context caching for long static system prompts.
+
+The prompt is registered once per model with the provider's caching facility and the
+returned handle is reused by every request until shortly before it expires. Creation never
+runs on the request path: a request that finds no fresh handle starts a background
+creation and sends the prompt inline (or keeps using the old handle while it is still
+within its TTL). If the provider refuses, creation is retried after a cooldown.
+
+Prompts estimated below MIN_CACHE_TOKENS are never submitted — Gemini rejects explicit
+caches under its per-model minimum (1024 tokens for 2.5 Flash), so the attempt would only
+cost a round trip. No prompt opts in today (cache_system=True): the psychologist prompt
+is ~500 tokens and carries the user's name, so it is sent inline.
+
+FakeCacheProvider lets this run offline (set_provider(FakeCacheProvider())).
+"""
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+MIN_CACHE_TOKENS = 1024
+
+
+class GeminiCacheProvider:
+    async def create(self, model: str, system_instruction: str, ttl_seconds: int) -> str:
+        from google.genai import types
+
+        from services.openai_service import get_client
+
+        cache = await get_client().aio.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                system_instruction=system_instruction,
+                ttl=f"{ttl_seconds}s",
+            ),
+        )
+        return cache.name
+
+
+class FakeCacheProvider:
+    """Offline stand-in: hands out sequential names and records what was registered."""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.created: list[tuple[str, str, int]] = []
+
+    async def create(self, model: str, system_instruction: str, ttl_seconds: int) -> str:
+        if self.fail:
+            raise RuntimeError("fake cache provider failure")
+        self.created.append((model, system_instruction, ttl_seconds))
+        return f"cachedContents/fake-{len(self.created)}"
+
+
+class PromptCache:
+    def __init__(self, provider, ttl_seconds: int = 3600, refresh_margin: int = 300,
+                 retry_after: int = 600, min_tokens: int = MIN_CACHE_TOKENS):
+        self.provider = provider
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = refresh_margin
+        self.retry_after = retry_after
+        self.min_tokens = min_tokens
+        # (model, prompt) → (cache name or None, refresh after, expires at)
+        self._entries: dict[tuple[str, str], tuple[str | None, float, float]] = {}
+        self._creating: dict[tuple[str, str], asyncio.Task] = {}
+
+    async def get(self, model: str, system_instruction: str) -> str | None:
+        """Cache handle for this prompt, or None if the prompt must be sent inline."""
+        key = (model, system_instruction)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+        if key not in self._creating:
+            self._creating[key] = asyncio.create_task(self._create(key))
+        # until the refresh lands, a handle still within its TTL stays usable
+        if entry is not None and entry[0] and entry[2] > now:
+            return entry[0]
+        return None
+
+    async def _create(self, key: tuple[str, str]) -> None:
+        from services.chat_summary import estimate_tokens
+
+        model, system_instruction = key
+        try:
+            if estimate_tokens(system_instruction) < self.min_tokens:
+                logger.info("Prompt for %s is below the cacheable minimum, sending inline", model)
+                self._entries[key] = (None, float("inf"), 0.0)
+                return
+            name = await self.provider.create(model, system_instruction, self.ttl_seconds)
+            now = time.monotonic()
+            self._entries[key] = (name, now + self.ttl_seconds - self.refresh_margin, now + self.ttl_seconds)
+            logger.info("Registered prompt cache %s for %s", name, model)
+        except Exception as e:
+            logger.warning("Prompt caching unavailable for %s, sending inline: %s", model, e)
+            self._entries[key] = (None, time.monotonic() + self.retry_after, 0.0)
+        finally:
+            self._creating.pop(key, None)
+
+
+_cache: PromptCache | None = None
+
+
+def get_cache() -> PromptCache:
+    global _cache
+    if _cache is None:
+        _cache = PromptCache(GeminiCacheProvider())
+    return _cache
+
+
+def set_provider(provider) -> None:
+    global _cache
+    _cache = PromptCache(provider)
@@ -0,0 +1,188 @@
+"""Text-generation providers behind services/openai_service.py, each with its own health.
+
+Every provider exposes the same call, returning a Completion (text, model, usage):
+    await provider.generate(op, system, messages, json_mode=..., temperature=..., max_tokens=...)
+where messages are [{"role": "user" | "assistant", "content": str}] — the chat-log format.
+
+GeminiProvider is primary; OpenRouterProvider (OpenAI-compatible API) is the hedge
+secondary; StubProvider serves canned answers with a fixed latency for offline tests.
+"""
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from services import metrics
+from services.ai_usage import Usage, gemini_usage
+
+
+class ProviderError(Exception):
+    pass
+
+
+@dataclass
+class Completion:
+    text: str
+    model: str
+    usage: Usage | None = None
+
+
+class ProviderHealth:
+    """Rolling latency window plus a simple circuit breaker on consecutive failures."""
+
+    def __init__(self, name: str, window: int = 200, failure_threshold: int = 3,
+                 cooldown: float = 30.0, min_samples: int = 20):
+        self.name = name
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+        self.consecutive_failures = 0
+        self._open_until = 0.0
+
+    def available(self) -> bool:
+        return time.monotonic() >= self._open_until
+
+    def percentile(self, q: float) -> float | None:
+        if len(self.latencies) < self.min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def record_latency(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+
+    def record_success(self, seconds: float) -> None:
+        self.record_latency(seconds)
+        self.consecutive_failures = 0
+        metrics.set_gauge("ai_provider_up", 1, provider=self.name)
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        metrics.inc("ai_provider_failures", provider=self.name)
+        if self.consecutive_failures >= self.failure_threshold:
+            self._open_until = time.monotonic() + self.cooldown
+            metrics.set_gauge("ai_provider_up", 0, provider=self.name)
+
+
+class GeminiProvider:
+    name = "gemini"
+
+    def __init__(self, model: str):
+        self.model = model
+        self.health = ProviderHealth(self.name)
+
+    async def _config(self, model: str, system: str, json_mode: bool, temperature: float,
+                      max_tokens: int | None, cache_system: bool):
+        from google.genai import types
+
+        from services import prompt_cache
+
+        config = types.GenerateContentConfig(temperature=temperature, max_output_tokens=max_tokens)
+        if json_mode:
+            config.response_mime_type = "application/json"
+        cached = await prompt_cache.get_cache().get(model, system) if cache_system else None
+        if cached:
+            config.cached_content = cached
+        else:
+            config.system_instruction = system
+        return config
+
+    @staticmethod
+    def _contents(messages: list[dict]):
+        from google.genai import types
+
+        return [
+            types.Content(
+                role="user" if m["role"] == "user" else "model",
+                parts=[types.Part.from_text(text=m["content"])],
+            )
+            for m in messages
+        ]
+
+    async def generate(self, op: str, system: str, messages: list[dict], *, json_mode: bool = False,
+                       temperature: float = 0.7, max_tokens: int | None = None,
+                       cache_system: bool = False, model: str | None = None) -> Completion:
+        from services.openai_service import get_client
+
+        model = model or self.model
+        config = await self._config(model, system, json_mode, temperature, max_tokens, cache_system)
+        response = await get_client().aio.models.generate_content(
+            model=model, contents=self._contents(messages), config=config,
+        )
+        return Completion(response.text, model, gemini_usage(response))
+
+    async def stream(self, op: str, system: str, messages: list[dict], *, temperature: float = 0.7,
+                     max_tokens: int | None = None, cache_system: bool = False,
+                     model: str | None = None):
+        """Async iterator of response chunks (objects with .text and .usage_metadata)."""
+        from services.openai_service import get_client
+
+        model = model or self.model
+        config = await self._config(model, system, False, temperature, max_tokens, cache_system)
+        return await get_client().aio.models.generate_content_stream(
+            model=model, contents=self._contents(messages), config=config,
+        )
+
+
+class OpenRouterProvider:
+    name = "openrouter"
+    URL = "https://openrouter.ai/api/v1/chat/completions"
+
+    def __init__(self, api_key: str, model: str):
+        self.api_key = api_key
+        self.model = model
+        self.health = ProviderHealth(self.name)
+        self._session = None
+
+    def _get_session(self):
+        import aiohttp
+
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(headers={"Authorization": f"Bearer {self.api_key}"})
+        return self._session
+
+    async def generate(self, op: str, system: str, messages: list[dict], *, json_mode: bool = False,
+                       temperature: float = 0.7, max_tokens: int | None = None,
+                       cache_system: bool = False, model: str | None = None) -> Completion:
+        # model names a Gemini tier; OpenRouter always uses its own configured model
+        body = {
+            "model": self.model,
+            "messages": [{"role": "system", "content": system}, *messages],
+            "temperature": temperature,
+        }
+        if max_tokens:
+            body["max_tokens"] = max_tokens
+        if json_mode:
+            body["response_format"] = {"type": "json_object"}
+
+        async with self._get_session().post(self.URL, json=body) as resp:
+            data = await resp.json(content_type=None)
+            if resp.status >= 400 or "choices" not in data:
+                raise ProviderError(f"OpenRouter {resp.status}: {data.get('error', data)}")
+        usage = data.get("usage") or {}
+        return Completion(
+            data["choices"][0]["message"]["content"],
+            data.get("model", self.model),
+            Usage(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)),
+        )
+
+
+class StubProvider:
+    """Offline provider: fixed latency, canned (or computed) response, optional failure."""
+
+    def __init__(self, name: str, response="{}", latency: float = 0.0, fail: bool = False):
+        self.name = name
+        self.response = response
+        self.latency = latency
+        self.fail = fail
+        self.calls: list[tuple[str, str, list[dict]]] = []
+        self.health = ProviderHealth(name)
+
+    async def generate(self, op: str, system: str, messages: list[dict], **kwargs) -> Completion:
+        self.calls.append((op, system, messages))
+        await asyncio.sleep(self.latency)
+        if self.fail:
+            raise ProviderError(f"{self.name} stub failure")
+        text = self.response(op, system, messages) if callable(self.response) else self.response
+        return Completion(text, kwargs.get("model") or self.name)
@@ -0,0 +1,88 @@
+"""Questionnaire analysis cache keyed by the Yes/No answer vector.
+
+32 Yes/No answers form a bit vector; the analysis depends only on it, the prompt and the
+model the questionnaire route picks (services/model_routing.py). Results are generated with
+a name placeholder and personalised on the way out, so one Gemini call serves every user
+with the same answer pattern. An answer that came from another model — a hedged OpenRouter
+reply — is returned but not cached. Kept in a small in-process LRU in front of the
+ptsd_questionnaire_cache table (cache_key, result jsonb).
+"""
+import hashlib
+import logging
+from collections import OrderedDict
+
+from db import client as db
+from services import ai_usage, metrics, model_routing, openai_service
+
+logger = logging.getLogger(__name__)
+
+NAME_PLACEHOLDER = "[ИМЯ]"
+YES, NO = "Да", "Нет"
+
+_MEMORY_LIMIT = 512
+_memory: OrderedDict[str, dict] = OrderedDict()
+
+
+def answer_vector(answers: list[dict]) -> str | None:
+    """Canonical '1011…' string ordered by question number; None if any answer isn't Yes/No."""
+    bits = []
+    for a in sorted(answers, key=lambda a: a["question_number"]):
+        if a["answer_text"] == YES:
+            bits.append("1")
+        elif a["answer_text"] == NO:
+            bits.append("0")
+        else:
+            return None
+    return "".join(bits)
+
+
+def cache_key(vector: str, model: str) -> str:
+    version = hashlib.sha256(openai_service.QUESTIONNAIRE_SYSTEM_PROMPT.encode()).hexdigest()[:12]
+    raw = f"{model}:{version}:{vector}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _personalise(result: dict, first_name: str) -> dict:
+    out = dict(result)
+    out["ai_summary"] = (result.get("ai_summary") or "").replace(NAME_PLACEHOLDER, first_name)
+    out["risk_factors"] = [f.replace(NAME_PLACEHOLDER, first_name) for f in result.get("risk_factors") or []]
+    return out
+
+
+def _remember(key: str, result: dict) -> None:
+    _memory[key] = result
+    _memory.move_to_end(key)
+    if len(_memory) > _MEMORY_LIMIT:
+        _memory.popitem(last=False)
+
+
+async def analyze(answers: list[dict], first_name: str) -> dict:
+    """Cached analyze_questionnaire; falls through to Gemini for unseen answer patterns."""
+    vector = answer_vector(answers)
+    if vector is None:
+        return await openai_service.analyze_questionnaire(answers, first_name)
+
+    prompt_chars = len(openai_service.questionnaire_prompt(answers, NAME_PLACEHOLDER))
+    route = model_routing.choose("questionnaire", prompt_chars)
+    key = cache_key(vector, route.model)
+    result = _memory.get(key)
+    if result is None:
+        result = await db.get_questionnaire_cache(key)
+        if result is not None:
+            _remember(key, result)
+    if result is not None:
+        metrics.inc("questionnaire_cache", outcome="hit")
+        return _personalise(result, first_name)
+
+    metrics.inc("questionnaire_cache", outcome="miss")
+    result = await openai_service.analyze_questionnaire(answers, NAME_PLACEHOLDER, route=route)
+    call = ai_usage.last_call.get()
+    if call is None or call.model != route.model:
+        metrics.inc("questionnaire_cache", outcome="not_stored")
+        return _personalise(result, first_name)
+    _remember(key, result)
+    try:
+        await db.save_questionnaire_cache(key, result)
+    except Exception as e:
+        logger.warning("Failed to persist questionnaire cache entry: %s", e)
+    return _personalise(result, first_name)
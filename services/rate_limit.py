@@ -0,0 +1,64 @@
+"""Per-user, per-route token buckets in front of expensive handlers.
+
+Memory is bounded: buckets live in an LRU capped at max_buckets, and buckets idle long
+enough to have refilled completely are dropped on the way.
+
+Handlers check `limiter` after their crisis check and right before the AI / history work,
+so a user who hit the limit is still screened for crisis phrases and never shed on that path.
+"""
+import time
+from collections import OrderedDict
+
+from config import settings
+from services import metrics
+
+RATE_LIMITED_MESSAGE = "⏳ Слишком много сообщений подряд. Подожди немного и напиши снова."
+
+
+class RateLimited(Exception):
+    pass
+
+
+class TokenBucketLimiter:
+    def __init__(self, limits: dict[str, tuple[float, float]], max_buckets: int = 10_000):
+        """limits: route → (refill rate per second, burst capacity). Other routes are exempt."""
+        self.limits = limits
+        self.max_buckets = max_buckets
+        # (user_id, route) → [tokens, last_refill]
+        self._buckets: OrderedDict[tuple[int, str], list[float]] = OrderedDict()
+
+    def allow(self, user_id: int, route: str) -> bool:
+        limit = self.limits.get(route)
+        if limit is None:
+            return True
+        rate, burst = limit
+        now = time.monotonic()
+        key = (user_id, route)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._evict(now)
+            bucket = self._buckets[key] = [burst, now]
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+
+        if bucket[0] < 1:
+            metrics.inc("rate_limited", route=route)
+            return False
+        bucket[0] -= 1
+        return True
+
+    def _evict(self, now: float) -> None:
+        # Oldest-first: stop at the first bucket that is still refilling
+        while self._buckets:
+            (_, route), (tokens, last) = next(iter(self._buckets.items()))
+            rate, burst = self.limits[route]
+            idle_full = tokens + (now - last) * rate >= burst
+            if not idle_full and len(self._buckets) < self.max_buckets:
+                break
+            self._buckets.popitem(last=False)
+
+
+limiter = TokenBucketLimiter(settings.RATE_LIMITS, settings.RATE_LIMIT_MAX_BUCKETS)
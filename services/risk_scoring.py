@@ -0,0 +1,104 @@
+"""Local deterministic PTSD risk scoring over the 32 Yes/No screening answers.
+
+Weighted item model: score = Σ weight[i] over items answered "Да", normalised to 0..1 and
+mapped to risk levels 0–5 by thresholds. "Да" on a critical item (thoughts of death or
+self-harm) sets suicide_indicators regardless of the total.
+
+Answers are packed into a bitmask and summed through per-byte lookup tables, so a score is
+four table lookups — microseconds, no network.
+"""
+from dataclasses import dataclass
+
+from config import settings
+from services.crisis import detect_crisis
+
+YES = "Да"
+
+# Besides CRISIS_KEYWORDS: wording that marks an item as critical when settings give no list.
+# Deliberately narrow — trauma-exposure items ("видели смерть") must not count.
+_CRITICAL_STEMS = ("навредить себе", "причинить себе вред", "свести счёты", "свести счеты")
+
+
+@dataclass
+class RiskScore:
+    risk_level: int
+    score: float
+    suicide_indicators: bool
+    risk_factors: list[str]
+
+
+class RiskModel:
+    def __init__(self, weights: list[float], thresholds: list[float],
+                 critical_items: set[int], item_texts: list[str] | None = None):
+        self.weights = weights
+        self.thresholds = thresholds
+        self.critical_mask = sum(1 << i for i in critical_items if i < len(weights))
+        self.item_texts = item_texts or []
+        self._max_score = sum(w for w in weights if w > 0) or 1.0
+        # _tables[b][byte] = Σ weights of the set bits of `byte` at byte position b
+        self._tables = [
+            [sum(weights[b * 8 + j] for j in range(8) if byte >> j & 1 and b * 8 + j < len(weights))
+             for byte in range(256)]
+            for b in range((len(weights) + 7) // 8)
+        ]
+
+    @staticmethod
+    def pack(answers: list[dict]) -> int:
+        """Bitmask with bit i set when question i was answered "Да"."""
+        mask = 0
+        for a in answers:
+            if a["answer_text"] == YES:
+                mask |= 1 << a["question_number"]
+        return mask
+
+    def score_mask(self, mask: int) -> tuple[int, float]:
+        """(risk level 0–5, normalised score) for a packed answer mask."""
+        raw = 0.0
+        for table in self._tables:
+            raw += table[mask & 0xFF]
+            mask >>= 8
+        score = raw / self._max_score
+        return sum(1 for t in self.thresholds if score >= t), score
+
+    def score(self, answers: list[dict]) -> RiskScore:
+        mask = self.pack(answers)
+        level, score = self.score_mask(mask)
+        return RiskScore(level, score, bool(mask & self.critical_mask), self._factors(mask))
+
+    def _factors(self, mask: int, top: int = 3) -> list[str]:
+        items = [i for i in range(len(self.weights)) if mask >> i & 1 and i < len(self.item_texts)]
+        items.sort(key=lambda i: self.weights[i], reverse=True)
+        return [self.item_texts[i] for i in items[:top]]
+
+
+def critical_items_from_questions(questions: list[dict]) -> set[int]:
+    """Positions of questions whose wording is about death, suicide or self-harm."""
+    found = set()
+    for i, q in enumerate(questions):
+        text = (q.get("question_text") or "").lower()
+        if detect_crisis(text) or any(stem in text for stem in _CRITICAL_STEMS):
+            found.add(i)
+    return found
+
+
+_model: RiskModel | None = None
+
+
+async def get_model() -> RiskModel:
+    """Built once from the questions table and RISK_* settings."""
+    global _model
+    if _model is None:
+        from db import client as db
+
+        questions = await db.get_questions()
+        n = len(questions)
+        weights = list(settings.RISK_WEIGHTS) or [1.0] * n
+        weights = (weights + [1.0] * n)[:n]
+        critical = set(settings.RISK_CRITICAL_ITEMS) or critical_items_from_questions(questions)
+        _model = RiskModel(
+            weights=weights,
+            thresholds=list(settings.RISK_THRESHOLDS),
+            critical_items=critical,
+            item_texts=[q.get("question_text", "") for q in questions],
+        )
+    return _model
@@ -0,0 +1,90 @@
+"""Progressive Telegram reply for streamed AI text: post, then edit in place at a throttled rate.
+
+Intermediate edits are sent without parse mode (half-written Markdown would be rejected);
+the final edit re-renders with the bot's default Markdown and falls back to plain text.
+Text above Telegram's message limit continues in follow-up messages.
+"""
+import time
+
+from aiogram.enums import ChatAction
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message, InlineKeyboardMarkup
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+def split_message(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> list[str]:
+    """Split text into <= limit pieces, preferring paragraph, line, then word boundaries."""
+    parts = []
+    while len(text) > limit:
+        cut = -1
+        for sep in ("\n\n", "\n", " "):
+            cut = text.rfind(sep, 0, limit)
+            if cut > limit // 2:
+                break
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    parts.append(text)
+    return parts
+
+
+class StreamingReply:
+    def __init__(self, message: Message, min_edit_interval: float = 1.5,
+                 reply_markup: InlineKeyboardMarkup | None = None):
+        self.message = message
+        self.min_edit_interval = min_edit_interval
+        self.reply_markup = reply_markup
+        self.text = ""
+        self._sent: list[Message] = []
+        self._shown: list[str] = []
+        self._last_flush = 0.0
+
+    async def start(self) -> None:
+        await self.message.bot.send_chat_action(self.message.chat.id, ChatAction.TYPING)
+
+    async def feed(self, chunk: str) -> None:
+        self.text += chunk
+        if time.monotonic() - self._last_flush >= self.min_edit_interval:
+            await self._flush(final=False)
+
+    async def finish(self) -> str:
+        await self._flush(final=True)
+        return self.text
+
+    async def _flush(self, final: bool) -> None:
+        self._last_flush = time.monotonic()
+        parts = split_message(self.text)
+        for i, part in enumerate(parts):
+            if not part:
+                continue
+            markup = self.reply_markup if final and i == len(parts) - 1 else None
+            if i >= len(self._sent):
+                self._sent.append(await self._send(part, final, markup))
+                self._shown.append(part)
+            elif final or part != self._shown[i]:
+                await self._edit(self._sent[i], part, final, markup)
+                self._shown[i] = part
+
+    async def _send(self, text: str, final: bool, markup) -> Message:
+        if final:
+            try:
+                return await self.message.answer(text, reply_markup=markup)
+            except TelegramBadRequest:
+                pass
+        return await self.message.answer(text, parse_mode=None, reply_markup=markup)
+
+    async def _edit(self, sent: Message, text: str, final: bool, markup) -> None:
+        try:
+            if final:
+                try:
+                    await sent.edit_text(text, reply_markup=markup)
+                    return
+                except TelegramBadRequest as e:
+                    if "not modified" in str(e):
+                        return
+            await sent.edit_text(text, parse_mode=None, reply_markup=markup)
+        except TelegramBadRequest as e:
+            if "not modified" not in str(e):
+                raise
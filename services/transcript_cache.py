@@ -0,0 +1,81 @@
+"""Voice transcripts cached by Telegram's file_unique_id.
+
+The same audio (a report re-sent after rejection, a retried update) has the same
+file_unique_id, so a hit skips both the download and the Gemini call. A small in-process
+LRU sits in front of the ptsd_transcripts table (file_unique_id, transcript, created_at);
+entries older than TRANSCRIPT_CACHE_TTL are ignored in both. Concurrent requests for the
+same file share one transcription.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from config import settings
+from db import client as db
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+_memory: OrderedDict[str, tuple[str, float]] = OrderedDict()
+_in_flight: dict[str, asyncio.Future] = {}
+
+
+def _remember(file_unique_id: str, transcript: str) -> None:
+    _memory[file_unique_id] = (transcript, time.monotonic())
+    _memory.move_to_end(file_unique_id)
+    while len(_memory) > settings.TRANSCRIPT_CACHE_MAX:
+        _memory.popitem(last=False)
+
+
+async def _lookup(file_unique_id: str) -> str | None:
+    entry = _memory.get(file_unique_id)
+    if entry is not None:
+        transcript, stored = entry
+        if time.monotonic() - stored <= settings.TRANSCRIPT_CACHE_TTL:
+            _memory.move_to_end(file_unique_id)
+            return transcript
+        del _memory[file_unique_id]
+    try:
+        transcript = await db.get_transcript(file_unique_id, settings.TRANSCRIPT_CACHE_TTL)
+    except Exception as e:
+        logger.warning("Transcript cache lookup failed: %s", e)
+        return None
+    if transcript is not None:
+        _remember(file_unique_id, transcript)
+    return transcript
+
+
+async def get_or_transcribe(file_unique_id: str, transcribe) -> str:
+    """Cached transcript for the file, or `await transcribe()` (download + Gemini) once."""
+    pending = _in_flight.get(file_unique_id)
+    if pending is not None:
+        metrics.inc("transcript_cache", outcome="joined")
+        return await asyncio.shield(pending)
+
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[file_unique_id] = future
+    try:
+        transcript = await _lookup(file_unique_id)
+        if transcript is not None:
+            metrics.inc("transcript_cache", outcome="hit")
+        else:
+            metrics.inc("transcript_cache", outcome="miss")
+            transcript = await transcribe()
+            if transcript:
+                _remember(file_unique_id, transcript)
+                try:
+                    await db.save_transcript(file_unique_id, transcript)
+                except Exception as e:
+                    logger.warning("Failed to persist transcript: %s", e)
+        future.set_result(transcript)
+        return transcript
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved when nobody joined
+        raise
+    finally:
+        del _in_flight[file_unique_id]
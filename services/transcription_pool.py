@@ -0,0 +1,81 @@
+"""Bounded pool for voice transcription jobs.
+
+TRANSCRIBE_WORKERS tasks take jobs (download + Gemini transcription) from one queue, so a
+burst of long voice reports cannot start unbounded concurrent downloads and calls. Each job
+gets a timeout scaled by the voice duration. When TRANSCRIBE_MAX_QUEUE jobs are already
+waiting, submit raises Overloaded. Queue depth, busy workers, wait/run time and processed
+audio seconds (throughput) are exported through services/metrics.
+"""
+import asyncio
+import logging
+import time
+
+from config import settings
+from services import metrics
+from services.admission import Overloaded
+
+logger = logging.getLogger(__name__)
+
+
+def timeout_for(duration: int) -> float:
+    timeout = settings.TRANSCRIBE_TIMEOUT_BASE + settings.TRANSCRIBE_TIMEOUT_PER_SECOND * duration
+    return min(timeout, settings.AI_TRANSCRIBE_TIMEOUT)
+
+
+class TranscriptionPool:
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._busy = 0
+
+    def _ensure_started(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def _publish(self) -> None:
+        metrics.set_gauge("transcription_queue_depth", self._queue.qsize())
+        metrics.set_gauge("transcription_busy_workers", self._busy)
+
+    async def submit(self, job, duration: int = 0) -> str:
+        """Run `await job()` on a pool worker; returns its result."""
+        self._ensure_started()
+        if self._queue.qsize() >= self.max_queue:
+            metrics.inc("transcription_jobs", outcome="shed")
+            raise Overloaded("transcription")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((job, duration, future, time.monotonic()))
+        self._publish()
+        return await future
+
+    async def _worker(self) -> None:
+        while True:
+            job, duration, future, enqueued = await self._queue.get()
+            if future.cancelled():  # the user's update was cancelled while queued
+                continue
+            self._busy += 1
+            self._publish()
+            metrics.observe("transcription_wait_seconds", time.monotonic() - enqueued)
+            start = time.monotonic()
+            try:
+                async with asyncio.timeout(timeout_for(duration)):
+                    result = await job()
+            except Exception as e:
+                outcome = "timeout" if isinstance(e, TimeoutError) else "error"
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                outcome = "ok"
+                metrics.inc("transcription_audio_seconds", duration)
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self._busy -= 1
+                self._publish()
+            metrics.inc("transcription_jobs", outcome=outcome)
+            metrics.observe("transcription_seconds", time.monotonic() - start)
+
+
+pool = TranscriptionPool(settings.TRANSCRIBE_WORKERS, settings.TRANSCRIBE_MAX_QUEUE)
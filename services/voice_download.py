@@ -0,0 +1,63 @@
+"""Voice note download with a hard size cap and one buffer per note.
+
+Notes over VOICE_MAX_BYTES are rejected from voice.file_size before anything is fetched.
+Notes up to VOICE_SPOOL_BYTES are downloaded into a BytesIO and handed on as a memoryview
+of its buffer (no .read() copy); larger ones stream to a temp file and are handed on as a
+memoryview of an mmap, so the whole note is never held in process memory. Splitting
+(services/ogg.py) works on these views; bytes are materialised only per request sent.
+"""
+import io
+import mmap
+import os
+import tempfile
+from contextlib import asynccontextmanager
+
+from config import settings
+from services import metrics
+
+
+class VoiceTooLarge(Exception):
+    pass
+
+
+def check_size(voice) -> None:
+    if (voice.file_size or 0) > settings.VOICE_MAX_BYTES:
+        metrics.inc("voice_download", outcome="too_large")
+        raise VoiceTooLarge(voice.file_size)
+
+
+@asynccontextmanager
+async def fetch(bot, voice):
+    """Yields the note's bytes as a memoryview, valid until the block exits."""
+    check_size(voice)
+    file = await bot.get_file(voice.file_id)
+    size = voice.file_size or 0
+
+    if 0 < size <= settings.VOICE_SPOOL_BYTES:
+        metrics.inc("voice_download", outcome="memory")
+        buf = io.BytesIO()
+        await bot.download_file(file.file_path, destination=buf)
+        view = buf.getbuffer()
+        try:
+            yield view
+        finally:
+            view.release()
+        return
+
+    metrics.inc("voice_download", outcome="spooled")
+    with tempfile.TemporaryFile(suffix=".ogg") as tmp:
+        await bot.download_file(file.file_path, destination=tmp)
+        tmp.flush()
+        actual = os.fstat(tmp.fileno()).st_size
+        if actual > settings.VOICE_MAX_BYTES:  # file_size was missing
+            raise VoiceTooLarge(actual)
+        mm = mmap.mmap(tmp.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mm)
+        try:
+            yield view
+        finally:
+            view.release()
+            try:
+                mm.close()
+            except BufferError:
+                pass  # a slice is still referenced (e.g. by a traceback); GC unmaps it
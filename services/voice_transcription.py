@@ -0,0 +1,83 @@
+"""Long voice notes: split into overlapping Ogg/Opus chunks, transcribe concurrently, stitch.
+
+Notes up to TRANSCRIBE_CHUNK_SECONDS go to Gemini as one blob. Longer ones are cut by
+services/ogg.py into chunks overlapping by TRANSCRIBE_CHUNK_OVERLAP seconds, so wall time
+follows the slowest chunk rather than the whole duration. The overlap is removed again by
+matching the tail of one transcript against the head of the next.
+
+Splitting is pure-Python page parsing and CRC work (~0.4 s for a 10-minute note), so it
+runs in a worker thread. At most TRANSCRIBE_CHUNK_CONCURRENCY chunks of one note hold
+admission slots at a time, and the first failed chunk cancels the rest.
+"""
+import asyncio
+import logging
+import re
+
+from config import settings
+from services import metrics, ogg
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+_MIN_MATCH = 2  # shorter matches are too likely to be accidental
+
+
+def _norm(word: str) -> str:
+    return "".join(_WORD_RE.findall(word.lower().replace("ё", "е")))
+
+
+def _overlap(prev: list[str], nxt: list[str], max_words: int) -> tuple[int, int]:
+    """(trailing words to drop from `prev`, leading words to drop from `nxt`); (0, 0) if no overlap.
+
+    The words at a cut are often half-heard, so one trailing word of prev and one leading
+    word of nxt may be left out of the match — and are dropped with it.
+    """
+    prev_n = [_norm(w) for w in prev[-(max_words + 1):]]
+    next_n = [_norm(w) for w in nxt[:max_words + 1]]
+    for k in range(min(max_words, len(prev_n), len(next_n)), _MIN_MATCH - 1, -1):
+        for drop_prev in (0, 1):
+            tail = prev_n[len(prev_n) - k - drop_prev:len(prev_n) - drop_prev]
+            for skip_next in (0, 1):
+                if len(tail) == k and next_n[skip_next:skip_next + k] == tail:
+                    return drop_prev, skip_next + k
+    return 0, 0
+
+
+def stitch(parts: list[str], max_overlap_words: int = 15) -> str:
+    words: list[str] = []
+    for part in parts:
+        nxt = part.split()
+        drop_prev, skip_next = _overlap(words, nxt, max_overlap_words)
+        del words[len(words) - drop_prev:]
+        words.extend(nxt[skip_next:])
+    return " ".join(words)
+
+
+async def transcribe_voice(file_bytes: bytes | memoryview, transcribe=None) -> str:
+    """Transcript of an Ogg/Opus voice note, chunked and parallel when it is long."""
+    if transcribe is None:
+        from services.openai_service import transcribe
+
+    try:
+        chunks = await asyncio.to_thread(ogg.split_opus, file_bytes, settings.TRANSCRIBE_CHUNK_SECONDS,
+                                         settings.TRANSCRIBE_CHUNK_OVERLAP)
+    except ValueError as e:
+        logger.warning("Voice note not splittable (%s), transcribing whole", e)
+        chunks = [file_bytes]
+
+    metrics.observe("transcription_chunks", len(chunks))
+    if len(chunks) == 1:
+        return await transcribe(chunks[0])
+
+    limit = asyncio.Semaphore(settings.TRANSCRIBE_CHUNK_CONCURRENCY)
+
+    async def one(chunk) -> str:
+        async with limit:
+            return await transcribe(chunk)
+
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(one(chunk)) for chunk in chunks]
+    except ExceptionGroup as eg:
+        raise eg.exceptions[0] from None  # callers handle Overloaded etc. as for one call
+    return stitch([task.result() for task in tasks])
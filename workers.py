@@ -0,0 +1,204 @@
+"""Sharded mode: one ingress process receives updates, N worker processes run main_router.
+
+Updates are routed by consistent hash of the sender's telegram_id, so all updates of one
+user land on the same worker and are handled there strictly in arrival order. Different
+users on the same worker still run concurrently.
+
+Enabled with WORKERS=N (0 = classic single-process polling in main.py). AI, admission
+and rate-limit metrics live in the workers; each pushes a snapshot every
+METRICS_PUSH_INTERVAL seconds and the ingress serves them all at /metrics.
+"""
+import asyncio
+import bisect
+import hashlib
+import hmac
+import logging
+import multiprocessing
+import threading
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_UPDATES = ["message", "callback_query"]
+METRICS_PUSH_INTERVAL = 5.0
+POLL_BACKOFF_MAX = 60.0
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes — adding a worker remaps only ~1/N users."""
+
+    def __init__(self, nodes: int, replicas: int = 64):
+        points = sorted((_hash(f"worker-{n}:{r}"), n) for n in range(nodes) for r in range(replicas))
+        self._points = [p for p, _ in points]
+        self._nodes = [n for _, n in points]
+
+    def node_for(self, key: int) -> int:
+        i = bisect.bisect(self._points, _hash(str(key))) % len(self._points)
+        return self._nodes[i]
+
+
+def update_user_id(update: dict) -> int:
+    """telegram_id of the update sender (same source the router uses: from_user.id)."""
+    for kind in ALLOWED_UPDATES:
+        event = update.get(kind)
+        if event and event.get("from"):
+            return event["from"]["id"]
+    return 0
+
+
+async def run_worker_loop(queue, handle) -> None:
+    """Consume (user_id, update) items until a None sentinel; per-user updates run in order."""
+    loop = asyncio.get_running_loop()
+    tails: dict[int, asyncio.Task] = {}
+
+    async def _chain(prev: asyncio.Task | None, update: dict):
+        if prev is not None:
+            await asyncio.wait([prev])
+        try:
+            await handle(update)
+        except Exception as e:
+            logger.error("Update %s failed: %s", update.get("update_id"), e)
+
+    def _release(user_id: int, task: asyncio.Task):
+        if tails.get(user_id) is task:
+            del tails[user_id]
+
+    while True:
+        item = await loop.run_in_executor(None, queue.get)
+        if item is None:
+            break
+        user_id, update = item
+        task = asyncio.create_task(_chain(tails.get(user_id), update))
+        tails[user_id] = task
+        task.add_done_callback(lambda t, uid=user_id: _release(uid, t))
+
+    if tails:
+        await asyncio.wait(list(tails.values()))
+
+
+async def _push_metrics(index: int, metrics_queue) -> None:
+    from services import metrics
+
+    while True:
+        await asyncio.sleep(METRICS_PUSH_INTERVAL)
+        metrics_queue.put((index, metrics.snapshot()))
+
+
+def worker_main(index: int, queue, metrics_queue=None) -> None:
+    """Worker process entry point: feed raw updates into the unchanged main_router."""
+    from aiogram import Dispatcher
+
+    from main import create_bot
+    from router import main_router
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"%(asctime)s - worker-{index} - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    async def _run():
+        bot = create_bot()
+        dp = Dispatcher()
+        dp.include_router(main_router)
+        pusher = asyncio.create_task(_push_metrics(index, metrics_queue)) if metrics_queue else None
+        try:
+            await run_worker_loop(queue, lambda update: dp.feed_raw_update(bot, update))
+        finally:
+            if pusher is not None:
+                pusher.cancel()
+            await bot.session.close()
+
+    asyncio.run(_run())
+
+
+class ShardedIngress:
+    """Receives updates (long polling or webhook) and hands them to worker processes."""
+
+    def __init__(self, workers: int, target=worker_main):
+        self._ctx = multiprocessing.get_context("spawn")
+        self._queues = [self._ctx.Queue() for _ in range(workers)]
+        self._metrics_queue = self._ctx.Queue()
+        self._procs = [
+            self._ctx.Process(target=target, args=(i, q, self._metrics_queue), name=f"worker-{i}",
+                              daemon=True)
+            for i, q in enumerate(self._queues)
+        ]
+        self._ring = HashRing(workers)
+        self._worker_metrics: dict[int, tuple] = {}
+        self._collector = threading.Thread(target=self._collect_metrics, name="metrics-collector",
+                                           daemon=True)
+
+    def start(self) -> None:
+        for proc in self._procs:
+            proc.start()
+        self._collector.start()
+        logger.info("Started %d update workers", len(self._procs))
+
+    def stop(self, timeout: float | None = 10) -> None:
+        for queue in self._queues:
+            queue.put(None)
+        for proc in self._procs:
+            proc.join(timeout=timeout)
+        self._metrics_queue.put(None)
+        self._collector.join(timeout=timeout)
+
+    def _collect_metrics(self) -> None:
+        while True:
+            item = self._metrics_queue.get()
+            if item is None:
+                break
+            index, snapshot = item
+            self._worker_metrics[index] = snapshot
+
+    def worker_metrics(self) -> dict[int, tuple]:
+        """Latest metrics snapshot pushed by each worker."""
+        return dict(self._worker_metrics)
+
+    def submit(self, update: dict) -> None:
+        user_id = update_user_id(update)
+        self._queues[self._ring.node_for(user_id)].put((user_id, update))
+
+    async def poll(self, token: str) -> None:
+        """Raw getUpdates long polling — updates are forwarded as JSON without parsing."""
+        import aiohttp
+
+        url = f"https://api.telegram.org/bot{token}/getUpdates"
+        offset = 0
+        backoff = 1.0
+        async with aiohttp.ClientSession() as session:
+            while True:
+                try:
+                    async with session.post(url, json={
+                        "offset": offset, "timeout": 30, "allowed_updates": ALLOWED_UPDATES,
+                    }, timeout=aiohttp.ClientTimeout(total=40)) as resp:
+                        data = await resp.json()
+                except Exception as e:
+                    logger.warning("getUpdates failed: %s", e)
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, POLL_BACKOFF_MAX)
+                    continue
+                if not data.get("ok"):
+                    # e.g. 409 (another getUpdates consumer or a webhook is set), 401 (bad token)
+                    retry_after = (data.get("parameters") or {}).get("retry_after")
+                    logger.error("getUpdates error %s: %s", data.get("error_code"), data.get("description"))
+                    await asyncio.sleep(retry_after or backoff)
+                    backoff = min(backoff * 2, POLL_BACKOFF_MAX)
+                    continue
+                backoff = 1.0
+                for update in data["result"]:
+                    offset = update["update_id"] + 1
+                    self.submit(update)
+
+    async def webhook_handler(self, request):
+        from aiohttp import web
+
+        from config import settings
+
+        secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not settings.WEBHOOK_SECRET or not hmac.compare_digest(secret, settings.WEBHOOK_SECRET):
+            return web.Response(status=403)
+        self.submit(await request.json())
+        return web.Response(text="OK")